@@ -1,18 +1,10 @@
 import streamlit as st
-from pymilvus import connections
-import time
-import os
-import diskcache
-import pandas as pd
-
-from utils.setup import setup_executors
-from db.document_store import store_documents
-from rag import answer_question, hybrid_search
-from utils.chunk_filter import is_irrelevant_chunk
-from utils.clean_text import clean_text
-from utils.stock_analysis import analyze_performance, analyze_before_after_performance, format_analysis_summary
-import plotly.graph_objects as go
-import plotly.express as px
+
+from utils.setup import setup_executors, setup_query_segmenter
+from utils import metrics
+
+# pandas, plotly, pymilvus, diskcache, 적재/검색 모듈은 첫 화면 표시를 늦추지 않도록
+# 실제로 필요한 시점(함수 안)에서 import합니다. Milvus 연결도 검색/적재를 처음 실행할 때 맺습니다.
 
 # --- 페이지 설정 ---
 st.set_page_config(page_title="뉴스 기반 주식 추천", page_icon="📰")
@@ -20,199 +12,302 @@ st.title("📰 뉴스 기반 주식 추천")
 
 # --- 초기화 ---
 @st.cache_resource
-def init_executors_and_db():
+def init_executors():
     try:
-        executors = setup_executors()
-        connections.connect()
-        return executors
+        return setup_executors()
     except Exception as e:
         st.error(f"초기화 중 오류 발생: {e}")
         return None
 
-executors = init_executors_and_db()
+
+@st.cache_resource
+def connect_milvus():
+    from pymilvus import connections
+    from db.collection_alias import start_retired_version_gc
+
+    connections.connect()
+    # 다음 적재를 기다리지 않고 유예 기간이 지난 이전 버전 컬렉션을 주기적으로 정리
+    start_retired_version_gc()
+
+
+def require_milvus():
+    """Milvus에 연결합니다. 실패하면 오류를 표시하고 실행을 멈춥니다. (실패는 캐시되지 않아 다음에 다시 시도)"""
+    try:
+        connect_milvus()
+    except Exception as e:
+        st.error(f"Milvus 연결 중 오류 발생: {e}")
+        st.stop()
+
+executors = init_executors()
 if executors is None:
     st.stop()
 
 segmentation_executor, embedding_executor, completion_executor = executors
+# 질의는 로컬 분할기(기본값)로 처리하고, 문서 적재는 CLOVA 분할기를 사용
+query_segmentation_executor = setup_query_segmenter(segmentation_executor)
+
+# --- 백그라운드 적재 작업 ---
+@st.cache_resource
+def get_ingest_registry():
+    # 세션/탭과 무관하게 서버 프로세스에서 하나의 작업 목록을 공유
+    from db.ingest_jobs import IngestJobRegistry
+
+    return IngestJobRegistry()
+
+ingest_registry = get_ingest_registry()
+
+STAGE_LABELS = {
+    "parsed": "파싱", "skipped": "건너뜀(저장 완료)", "segmented": "문단 분할",
+    "embedded": "임베딩", "inserted": "저장", "failed": "실패",
+}
+
+
+@st.fragment(run_every=2)
+def ingest_status_panel():
+    """적재 작업 진행 상황을 2초마다 갱신합니다. 페이지 전체가 아닌 이 영역만 다시 실행됩니다."""
+    job = ingest_registry.latest()
+    if job is None:
+        return
+    status = job.snapshot()
+    st.markdown(f"**적재 작업 `{status['job_id']}`**: {status['stage']} ({status['elapsed']:.0f}초 경과)")
+    st.table({
+        "단계": [STAGE_LABELS[name] for name in status["counts"]],
+        "기사 수": list(status["counts"].values()),
+        "초당 처리량": [f"{rate:.2f}" for rate in status["rates"].values()],
+    })
+    if job.running:
+        if status["cancel_requested"]:
+            st.info("취소 요청됨. 처리 중인 기사까지 저장한 뒤 중단합니다.")
+        elif st.button("적재 작업 취소", key=f"cancel_{status['job_id']}"):
+            job.cancel()
+    elif status["status"] == "succeeded":
+        st.success("문서 처리가 완료되었습니다! 새 컬렉션으로 검색 대상이 전환되었습니다.")
+    elif status["status"] == "incomplete":
+        st.warning(f"저장되지 않은 기사 {status['counts']['failed']}개가 있어 검색 대상은 이전 버전을 유지합니다. "
+                   "다시 시작하면 남은 기사만 이어서 처리합니다.")
+    elif status["status"] == "cancelled":
+        st.warning("적재 작업이 취소되었습니다. 다시 시작하면 이어서 진행합니다.")
+    else:
+        st.error(f"적재 작업 실패: {status['error']}")
+
 
 # --- 사이드바 기능 ---
 with st.sidebar:
     st.header("데이터 관리")
     st.markdown("새로운 `.txt` 파일을 `data` 폴더에 추가한 후, 아래 버튼을 눌러 데이터베이스를 업데이트하세요.")
+    st.caption("문서 처리는 백그라운드에서 진행되며, 그동안에도 기존 컬렉션으로 추천 기능을 사용할 수 있습니다.")
     if st.button("데이터베이스 초기화 및 문서 처리"):
-        with st.spinner("문서 처리 중... 기존 데이터를 삭제하고 새로 임베딩합니다."):
-            store_documents(segmentation_executor, embedding_executor, data_dir="data")
-            st.success("문서 처리가 완료되었습니다!")
-            st.info("채팅 기록이 초기화됩니다.")
-            time.sleep(2)
-            st.rerun()
+        require_milvus()
+        job = ingest_registry.start(segmentation_executor, embedding_executor, data_dir="data")
+        st.toast(f"적재 작업 `{job.job_id}`이(가) 실행 중입니다.")
+    ingest_status_panel()
     if st.button("임베딩/청킹 캐시 삭제"):
+        import diskcache
+
         seg_cache = diskcache.Cache('segmentation_cache.db')
         emb_cache = diskcache.Cache('embedding_cache.db')
         seg_cache.clear()
         emb_cache.clear()
         st.success("임베딩/청킹 캐시가 모두 삭제되었습니다.")
 
-# --- 사용자 입력 및 추천 ---
-prompt = st.text_area("뉴스 기사 입력", "", height=200)
+# --- 종목별 분석/차트 (결과 캐시) ---
+@st.cache_data(show_spinner=False)
+def cached_before_after_analysis(company, base_date, prices):
+    """(company, base_date, prices)가 같으면 다시 계산하지 않습니다."""
+    from utils.stock_analysis import analyze_before_after_performance
 
-if st.button("추천 종목 분석하기") and prompt.strip():
-    with st.spinner("추천 종목을 분석하는 중입니다..."):
-        cleaned_prompt = clean_text(prompt)
-        segmented_chunks = segmentation_executor.execute({"text": prompt})
-        filtered_chunks = []
-        for chunk in segmented_chunks:
-            chunk_text = chunk if isinstance(chunk, str) else ' '.join(chunk)
-            if not is_irrelevant_chunk(chunk_text):
-                filtered_chunks.append(chunk_text)
-        filtered_full_text = '\n'.join(filtered_chunks)
+    return analyze_before_after_performance(prices, base_date, days_before=5, days_after=5)
+
+
+@st.cache_data(show_spinner=False)
+def build_price_chart(company, base_date, prices):
+    """기준일 이전/당일/이후를 색으로 구분한 종가 차트를 생성합니다. 데이터가 부족하면 None"""
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    prices_df = pd.DataFrame(prices).sort_values("date")
+    if len(prices_df) <= 1:
+        return None
+
+    # 차트 데이터 준비
+    prices_df['date'] = pd.to_datetime(prices_df['date'])
+    base_dt = pd.to_datetime(base_date)
+
+    # 이전/이후/기준일 구분
+    prices_df['period'] = prices_df['date'].apply(
+        lambda x: '이전' if x < base_dt else ('기준일' if x == base_dt else '이후')
+    )
+
+    # Plotly로 차트 생성
+    fig = go.Figure()
+
+    # 색상 구분
+    colors = {'이전': '#FF6B6B', '기준일': '#4ECDC4', '이후': '#45B7D1'}
+
+    for period in ['이전', '기준일', '이후']:
+        period_data = prices_df[prices_df['period'] == period]
+        if not period_data.empty:
+            fig.add_trace(go.Scatter(
+                x=period_data['date'],
+                y=period_data['close'],
+                mode='lines+markers',
+                name=period,
+                line=dict(color=colors[period], width=3),
+                marker=dict(size=8)
+            ))
+
+    # 기준일에 수직선 추가
+    base_dt_for_plot = base_dt.to_pydatetime() if hasattr(base_dt, 'to_pydatetime') else base_dt
+
+    fig.add_shape(
+        type="line",
+        x0=base_dt_for_plot,
+        y0=0,
+        x1=base_dt_for_plot,
+        y1=1,
+        yref="paper",
+        line=dict(color="gray", width=2, dash="dash")
+    )
+
+    # 기준일 텍스트 annotation
+    fig.add_annotation(
+        x=base_dt_for_plot,
+        y=1.02,
+        yref="paper",
+        text="기준일",
+        showarrow=False,
+        font=dict(color="gray", size=12),
+        xanchor="center"
+    )
+
+    # 차트 레이아웃 설정
+    fig.update_layout(
+        title=f"{company} 주가 추이 ({base_date} 기준)",
+        xaxis_title="날짜",
+        yaxis_title="종가 (원)",
+        height=400,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    fig.update_yaxes(autorange=True)
+    return fig
+
+
+def recommend(prompt):
+    """뉴스 본문으로 추천 종목을 검색하고 (결과, 단계별 처리 시간 trace)를 반환합니다."""
+    from rag import hybrid_search, preprocess_news
+    from utils.stock_analysis import analyze_performance
+
+    with metrics.trace_request() as request_trace:
+        cleaned_prompt, filtered_full_text, filtered_chunks = preprocess_news(prompt, query_segmentation_executor)
 
         ranked_stocks = hybrid_search(
             cleaned_prompt,
-            segmentation_executor,
+            query_segmentation_executor,
             embedding_executor,
             filtered_full_text=filtered_full_text,
             filtered_chunks=filtered_chunks
         )
+        if isinstance(ranked_stocks, tuple):
+            # 컬렉션이 없을 때는 (메시지, []) 형태로 반환됨
+            return ranked_stocks[0], request_trace
         for comp in ranked_stocks:
             result = analyze_performance(comp["prices"], comp["base_date"])
             if result:
                 comp.update(result)
+    return ranked_stocks, request_trace
 
-        # 출력 처리
-        if isinstance(ranked_stocks, str):
-            st.markdown(ranked_stocks)
-        elif not ranked_stocks:
-            st.warning("추천된 종목이 없습니다. 뉴스 내용이 너무 일반적이거나 관련 데이터가 부족할 수 있습니다.")
-        else:
-            st.markdown("## 🏆 추천 종목 랭킹")
-            
-            for idx, item in enumerate(ranked_stocks, 1):
-                st.markdown(f"### {idx}. 📊 {item['company']} ({item['base_date']} 기준)")
-                
-                # 메인 레이아웃: 왼쪽에 랭킹 정보, 오른쪽에 핵심 지표
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown("**📈 종목 정보**")
-                    st.markdown(f"- **유사도 점수**: {item['score']:.4f}")
-                    st.markdown(f"- **기준 날짜**: {item['base_date']}")
-                    st.markdown(f"- **데이터 수**: {len(item['prices'])}일")
-                
-                with col2:
-                    # 간단한 3개 지표 분석 실행
-                    detailed_analysis = analyze_before_after_performance(
-                        item["prices"], 
-                        item["base_date"], 
-                        days_before=5, 
-                        days_after=5
-                    )
-                    
-                    # 분석 결과 표시
-                    if detailed_analysis and "error" not in detailed_analysis:
-                        st.markdown("**📊 핵심 지표 분석**")
-                        st.markdown(f"• **평균 상승률**: {detailed_analysis['avg_price_change']:+.1f}%")
-                        st.markdown(f"• **최고 상승률**: {detailed_analysis['max_price_change']:+.1f}%")
-                        st.markdown(f"• **거래량 증감률**: {detailed_analysis['volume_change']:+.1f}%")
-                    else:
-                        st.markdown("**⚠️ 분석 불가**")
-                        st.markdown(f"오류: {detailed_analysis.get('error', '알 수 없는 오류')}")
-                
-                # 주가 데이터 테이블과 상세 분석
-                st.markdown("---")
-                
-                # 주가 데이터 테이블
-                prices_df = pd.DataFrame(item["prices"]).sort_values("date")
-                st.markdown("**📋 주가 데이터**")
-                # st.dataframe(prices_df, use_container_width=True)
-                
-                # 상세 분석 결과 (확장 가능한 섹션)
-                with st.expander("📋 상세 분석 데이터 보기"):
-                    if detailed_analysis and "error" not in detailed_analysis:
-                        st.json(detailed_analysis)
-                    else:
-                        st.error("상세 분석 데이터를 불러올 수 없습니다.")
-                    
-                    # 주가 차트
-                    if len(prices_df) > 1:
-                        # 차트 데이터 준비
-                        prices_df_chart = prices_df.copy()
-                        prices_df_chart['date'] = pd.to_datetime(prices_df_chart['date'])
-                        base_dt = pd.to_datetime(item['base_date'])
-                        
-                        # 이전/이후/기준일 구분
-                        prices_df_chart['period'] = prices_df_chart['date'].apply(
-                            lambda x: '이전' if x < base_dt else ('기준일' if x == base_dt else '이후')
-                        )
-                        
-                        # Plotly로 차트 생성
-                        fig = go.Figure()
-                        
-                        # 색상 구분
-                        colors = {'이전': '#FF6B6B', '기준일': '#4ECDC4', '이후': '#45B7D1'}
-                        
-                        for period in ['이전', '기준일', '이후']:
-                            period_data = prices_df_chart[prices_df_chart['period'] == period]
-                            if not period_data.empty:
-                                fig.add_trace(go.Scatter(
-                                    x=period_data['date'],
-                                    y=period_data['close'],
-                                    mode='lines+markers',
-                                    name=period,
-                                    line=dict(color=colors[period], width=3),
-                                    marker=dict(size=8)
-                                ))
-                        
-                        # 기준일에 수직선 추가
-                        base_dt_for_plot = base_dt.to_pydatetime() if hasattr(base_dt, 'to_pydatetime') else base_dt
-                        
-                        fig.add_shape(
-                            type="line",
-                            x0=base_dt_for_plot,
-                            y0=0,
-                            x1=base_dt_for_plot,
-                            y1=1,
-                            yref="paper",
-                            line=dict(color="gray", width=2, dash="dash")
-                        )
-                        
-                        # 기준일 텍스트 annotation
-                        fig.add_annotation(
-                            x=base_dt_for_plot,
-                            y=1.02,
-                            yref="paper",
-                            text="기준일",
-                            showarrow=False,
-                            font=dict(color="gray", size=12),
-                            xanchor="center"
-                        )
-                        
-                        # 차트 레이아웃 설정
-                        fig.update_layout(
-                            title=f"{item['company']} 주가 추이 ({item['base_date']} 기준)",
-                            xaxis_title="날짜",
-                            yaxis_title="종가 (원)",
-                            height=400,
-                            hovermode='x unified',
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1
-                            )
-                        )
-                        
-                        fig.update_yaxes(autorange=True)
+
+# --- 사용자 입력 및 추천 ---
+prompt = st.text_area("뉴스 기사 입력", "", height=200)
+
+if st.button("추천 종목 분석하기") and prompt.strip():
+    require_milvus()
+    with st.spinner("추천 종목을 분석하는 중입니다..."):
+        ranked_stocks, request_trace = recommend(prompt)
+    # 다른 위젯(차트 토글 등)으로 rerun되어도 다시 검색하지 않도록 세션에 보관
+    st.session_state["recommendation"] = {
+        "ranked_stocks": ranked_stocks,
+        "elapsed": request_trace.elapsed,
+        "timings": request_trace.summary(),
+    }
+
+recommendation = st.session_state.get("recommendation")
+if recommendation is not None:
+    ranked_stocks = recommendation["ranked_stocks"]
+
+    # 출력 처리
+    if isinstance(ranked_stocks, str):
+        st.markdown(ranked_stocks)
+    elif not ranked_stocks:
+        st.warning("추천된 종목이 없습니다. 뉴스 내용이 너무 일반적이거나 관련 데이터가 부족할 수 있습니다.")
+    else:
+        st.markdown("## 🏆 추천 종목 랭킹")
+
+        for idx, item in enumerate(ranked_stocks, 1):
+            st.markdown(f"### {idx}. 📊 {item['company']} ({item['base_date']} 기준)")
+
+            # 메인 레이아웃: 왼쪽에 랭킹 정보, 오른쪽에 핵심 지표
+            col1, col2 = st.columns([1, 1])
+
+            with col1:
+                st.markdown("**📈 종목 정보**")
+                st.markdown(f"- **유사도 점수**: {item['score']:.4f}")
+                st.markdown(f"- **기준 날짜**: {item['base_date']}")
+                st.markdown(f"- **데이터 수**: {len(item['prices'])}일")
+
+            with col2:
+                # 간단한 3개 지표 분석 실행
+                detailed_analysis = cached_before_after_analysis(item["company"], item["base_date"], item["prices"])
+
+                # 분석 결과 표시
+                if detailed_analysis and "error" not in detailed_analysis:
+                    st.markdown("**📊 핵심 지표 분석**")
+                    st.markdown(f"• **평균 상승률**: {detailed_analysis['avg_price_change']:+.1f}%")
+                    st.markdown(f"• **최고 상승률**: {detailed_analysis['max_price_change']:+.1f}%")
+                    st.markdown(f"• **거래량 증감률**: {detailed_analysis['volume_change']:+.1f}%")
+                else:
+                    st.markdown("**⚠️ 분석 불가**")
+                    st.markdown(f"오류: {detailed_analysis.get('error', '알 수 없는 오류')}")
+
+            # 주가 데이터 테이블과 상세 분석
+            st.markdown("---")
+
+            # 주가 데이터 테이블
+            st.markdown("**📋 주가 데이터**")
+            # st.dataframe(pd.DataFrame(item["prices"]).sort_values("date"), use_container_width=True)
+
+            # 상세 분석 결과 (확장 가능한 섹션)
+            with st.expander("📋 상세 분석 데이터 보기"):
+                if detailed_analysis and "error" not in detailed_analysis:
+                    st.json(detailed_analysis)
+                else:
+                    st.error("상세 분석 데이터를 불러올 수 없습니다.")
+
+                # 주가 차트는 요청한 경우에만 생성
+                chart_key = f"chart_{item['company']}_{item['base_date']}"
+                if st.toggle("📈 주가 차트 보기", key=chart_key):
+                    fig = build_price_chart(item["company"], item["base_date"], item["prices"])
+                    if fig is not None:
                         st.plotly_chart(fig, use_container_width=True)
                     else:
                         st.info("차트를 그리기에 데이터가 충분하지 않습니다.")
-                
-                # 구분선 (마지막 항목이 아닌 경우만)
-                if idx < len(ranked_stocks):
-                    st.markdown("---")
-                    st.markdown("")  # 공백 추가
 
+            # 구분선 (마지막 항목이 아닌 경우만)
+            if idx < len(ranked_stocks):
+                st.markdown("---")
+                st.markdown("")  # 공백 추가
+
+        # (선택) 디버깅용
+        # st.json(ranked_stocks)
 
-            # (선택) 디버깅용
-            # st.json(ranked_stocks)
+    # 단계별 처리 시간 (접을 수 있는 섹션)
+    with st.expander(f"⏱️ 단계별 처리 시간 (총 {recommendation['elapsed']:.2f}초)"):
+        st.table(recommendation["timings"])
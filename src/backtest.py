@@ -0,0 +1,225 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+from pymilvus import connections
+from tqdm import tqdm
+
+from db.collection_alias import COLLECTION_ALIAS, get_search_collection
+from utils import metrics
+from utils.stock_analysis import compute_forward_returns
+
+STAGE_METRIC = "backtest_stage_seconds"
+
+
+def load_corpus(collection, batch_size=5000):
+    """
+    컬렉션의 모든 행(id, type, metadata, embedding)을 읽어 DataFrame과 벡터 행렬로 반환합니다.
+
+    DataFrame 컬럼:
+        row_id, type, company, base_date, date, close, key(company__base_date),
+        delta_days(date - base_date), article(기사 식별자), group(자기 자신 제외 단위)
+    """
+    iterator = collection.query_iterator(batch_size=batch_size, output_fields=["id", "type", "metadata", "embedding"])
+    records, vectors = [], []
+    with tqdm(desc="코퍼스 불러오는 중") as progress:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            for row in batch:
+                meta = row["metadata"] or {}
+                records.append((
+                    row["id"], row["type"], meta.get("company"), meta.get("base_date"), meta.get("date"),
+                    meta.get("close"), meta.get("url"), meta.get("article_key")
+                ))
+            vectors.append(np.asarray([row["embedding"] for row in batch], dtype=np.float32))
+            progress.update(len(batch))
+
+    corpus = pd.DataFrame.from_records(
+        records, columns=["row_id", "type", "company", "base_date", "date", "close", "url", "article_key"]
+    )
+    base_dt = pd.to_datetime(corpus["base_date"], format="%Y-%m-%d", errors="coerce")
+    date_dt = pd.to_datetime(corpus["date"], format="%Y-%m-%d", errors="coerce")
+    corpus["delta_days"] = (date_dt - base_dt).dt.days
+    corpus["key"] = corpus["company"] + "__" + corpus["base_date"]
+    # hybrid_search와 동일하게 company/base_date/date가 없거나 날짜 파싱이 안 되는 행은 점수에서 제외
+    corpus.loc[corpus["company"].isna() | corpus["delta_days"].isna(), "key"] = None
+
+    # article: 한 기사(문서 행 + 청크 행), group: 같은 url을 공유하는 기사들 (날짜별로 반복 저장된 같은 뉴스)
+    fallback = corpus["company"].fillna("") + "|" + corpus["date"].fillna("") + "|" + corpus["url"].fillna("")
+    corpus["article"] = corpus["article_key"].fillna(fallback)
+    corpus["group"] = corpus["url"].where(corpus["url"].fillna("") != "", corpus["article"])
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 1024), dtype=np.float32)
+    return corpus, matrix
+
+
+def _batched_search(collection, vectors, limit, expr, batch_size):
+    """벡터 행렬을 batch_size씩 나누어 검색하고, 각 벡터의 (id 리스트, distance 리스트)를 반환합니다."""
+    search_params = {"metric_type": "IP", "params": {"ef": max(32, limit)}}
+    ids, distances = [], []
+    for start in tqdm(range(0, len(vectors), batch_size), desc=f"배치 검색 중 ({expr})"):
+        with metrics.timer("milvus_search_seconds", "Milvus 검색 시간", kind="backtest"):
+            results = collection.search(
+                data=vectors[start:start + batch_size].tolist(),
+                anns_field="embedding",
+                param=search_params,
+                limit=limit,
+                output_fields=[],
+                expr=expr
+            )
+        for hits in results:
+            ids.append(hits.ids)
+            distances.append(hits.distances)
+    return ids, distances
+
+
+def collect_hits(collection, corpus, matrix, topk=10, search_batch_size=256):
+    """
+    저장된 모든 기사를 질의로 재생하여 문서/청크 검색 결과를 하나의 hit 테이블로 모읍니다.
+    질의 기사와 같은 group(같은 url)의 행은 결과에서 제외하고, 제외 후 상위 topk개만 사용합니다.
+
+    Returns:
+        tuple: (queries DataFrame, hits DataFrame[query, row, distance, is_doc])
+    """
+    row_index = dict(zip(corpus["row_id"].tolist(), range(len(corpus))))
+    groups = corpus["group"].tolist()
+
+    doc_rows = corpus.index[corpus["type"] == "doc"]
+    # 같은 뉴스가 날짜별로 여러 번 저장되어 있으므로 group당 한 번만 질의
+    queries = corpus.loc[doc_rows].drop_duplicates("group")[["row_id", "article", "group", "key"]].reset_index()
+    queries = queries.rename(columns={"index": "doc_row"})
+    query_of_article = pd.Series(queries.index, index=queries["article"])
+    query_groups = queries["group"].tolist()
+
+    chunk_mask = (corpus["type"] == "chunk") & corpus["article"].isin(query_of_article.index)
+    chunk_rows = corpus.index[chunk_mask]
+    chunk_owner = query_of_article.loc[corpus.loc[chunk_rows, "article"]].to_numpy()
+
+    # 제외될 자기 group 행 수만큼 여유를 두고 검색
+    pad = {t: int(min(100, corpus.loc[corpus["type"] == t, "group"].value_counts().max() or 0)) for t in ("doc", "chunk")}
+
+    columns = {"query": [], "row": [], "distance": [], "is_doc": []}
+    plans = [
+        ("doc", queries["doc_row"].to_numpy(), np.arange(len(queries))),
+        ("chunk", chunk_rows.to_numpy(), chunk_owner),
+    ]
+    for kind, vector_rows, owners in plans:
+        if len(vector_rows) == 0:
+            continue
+        with metrics.timer(STAGE_METRIC, "백테스트 단계별 시간", stage=f"{kind}_search"):
+            ids, distances = _batched_search(
+                collection, matrix[vector_rows], topk + pad[kind], f"type == '{kind}'", search_batch_size
+            )
+        for owner, hit_ids, hit_distances in zip(owners, ids, distances):
+            own_group = query_groups[owner]
+            kept = 0
+            for hit_id, distance in zip(hit_ids, hit_distances):
+                row = row_index.get(hit_id)
+                if row is None or groups[row] == own_group:
+                    continue
+                columns["query"].append(owner)
+                columns["row"].append(row)
+                columns["distance"].append(distance)
+                columns["is_doc"].append(kind == "doc")
+                kept += 1
+                if kept >= topk:
+                    break
+
+    hits = pd.DataFrame(columns)
+    rows = hits["row"].to_numpy(dtype=np.int64)
+    hits["key"] = corpus["key"].to_numpy()[rows]
+    hits["abs_delta"] = corpus["delta_days"].abs().to_numpy()[rows]
+    return queries, hits.dropna(subset=["key"])
+
+
+def rank_picks(hits, doc_weight, chunk_weight, date_window, top_n=3):
+    """
+    hybrid_search와 같은 방식으로 (company, base_date)별 점수를 합산하여 질의마다 상위 top_n개를 고릅니다.
+    score = distance * (doc_weight 또는 chunk_weight), |date - base_date| > date_window인 hit는 제외.
+    """
+    window_hits = hits[hits["abs_delta"] <= date_window]
+    scores = window_hits["distance"] * np.where(window_hits["is_doc"], doc_weight, chunk_weight)
+    totals = scores.groupby([window_hits["query"], window_hits["key"]]).sum().rename("score").reset_index()
+    totals = totals.sort_values(["query", "score"], ascending=[True, False])
+    picks = totals.groupby("query").head(top_n).copy()
+    picks["rank"] = picks.groupby("query").cumcount() + 1
+    return picks
+
+
+def run_backtest(param_grid, topk=10, top_n=3, days_ahead=5, search_batch_size=256):
+    """
+    저장된 모든 기사를 질의로 재생하여 파라미터 조합별 추천 성과를 계산합니다.
+
+    검색 결과는 doc_weight/chunk_weight/date_window와 무관하므로 한 번만 배치 검색하고,
+    각 조합은 메모리의 hit 테이블에서 벡터 연산으로 다시 랭킹합니다.
+
+    Args:
+        param_grid (dict): {"doc_weight": [...], "chunk_weight": [...], "date_window": [...]}
+        topk (int): 문서/청크 벡터당 검색 결과 수 (hybrid_search의 topk)
+        top_n (int): 질의당 추천 종목 수
+        days_ahead (int): 기준일 이후 수익률 계산 기간 (analyze_performance와 동일)
+        search_batch_size (int): search 호출 한 번에 넣을 질의 벡터 수
+
+    Returns:
+        pd.DataFrame: 조합별 질의 수, 추천 수, 적중률(수익률 > 0), 평균 수익률, 1위 평균 수익률
+    """
+    collection = get_search_collection()
+    if collection is None:
+        raise RuntimeError(f"'{COLLECTION_ALIAS}' 컬렉션이 존재하지 않습니다. 먼저 문서를 처리하고 저장해주세요.")
+
+    started = time.time()
+    with metrics.timer(STAGE_METRIC, "백테스트 단계별 시간", stage="load_corpus"):
+        corpus, matrix = load_corpus(collection)
+    with metrics.timer(STAGE_METRIC, "백테스트 단계별 시간", stage="forward_returns"):
+        returns = compute_forward_returns(corpus.dropna(subset=["company"]), days_ahead=days_ahead)
+        returns.index = returns.index.get_level_values(0) + "__" + returns.index.get_level_values(1)
+    queries, hits = collect_hits(collection, corpus, matrix, topk=topk, search_batch_size=search_batch_size)
+    print(f"질의 {len(queries)}개, hit {len(hits)}개 수집 완료 ({time.time() - started:.1f}초)")
+
+    names = list(param_grid)
+    reports = []
+    with metrics.timer(STAGE_METRIC, "백테스트 단계별 시간", stage="grid"):
+        for values in tqdm(list(itertools.product(*param_grid.values())), desc="파라미터 조합 평가 중"):
+            params = dict(zip(names, values))
+            picks = rank_picks(
+                hits,
+                params.get("doc_weight", 1.0),
+                params.get("chunk_weight", 0.7),
+                params.get("date_window", 10),
+                top_n=top_n
+            )
+            picks["return"] = picks["key"].map(returns)
+            scored = picks.dropna(subset=["return"])
+            reports.append({
+                **params,
+                "queries": picks["query"].nunique(),
+                "picks": len(picks),
+                "scored_picks": len(scored),
+                "hit_rate": (scored["return"] > 0).mean() if len(scored) else np.nan,
+                "avg_return": scored["return"].mean() if len(scored) else np.nan,
+                "top1_avg_return": scored.loc[scored["rank"] == 1, "return"].mean() if len(scored) else np.nan,
+            })
+    print(f"백테스트 완료: {len(reports)}개 조합, 총 {time.time() - started:.1f}초")
+    return pd.DataFrame(reports).sort_values("avg_return", ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="저장된 뉴스로 hybrid_search 파라미터 백테스트")
+    parser.add_argument("--doc-weight", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--chunk-weight", type=float, nargs="+", default=[0.7])
+    parser.add_argument("--date-window", type=int, nargs="+", default=[10])
+    parser.add_argument("--topk", type=int, default=10)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--days-ahead", type=int, default=5)
+    args = parser.parse_args()
+
+    connections.connect()
+    report = run_backtest(
+        {"doc_weight": args.doc_weight, "chunk_weight": args.chunk_weight, "date_window": args.date_window},
+        topk=args.topk, top_n=args.top_n, days_ahead=args.days_ahead
+    )
+    print(report.to_string())
@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+
+from pymilvus import FieldSchema, CollectionSchema, DataType, Collection, utility
+from pymilvus.client.types import LoadState
+
+from db.ingest_journal import IngestJournal
+
+# 검색 경로는 항상 이 alias로 접근하고, 실제 데이터는 버전별 컬렉션에 저장됩니다.
+COLLECTION_ALIAS = "NewsPickStock"
+VERSION_PREFIX = f"{COLLECTION_ALIAS}_v"
+
+_search_collection = None
+_search_collection_lock = threading.Lock()
+
+
+def new_version_name():
+    """
+    새 버전 컬렉션 이름 (예: NewsPickStock_v20250613153000_3f9a1c2b)
+    같은 초에 시작한 빌드끼리 이름이 겹치지 않도록 임의의 접미사를 붙입니다.
+    """
+    return f"{VERSION_PREFIX}{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def create_collection(collection_name):
+    """
+    새 버전 컬렉션을 만듭니다. 같은 이름의 컬렉션이 이미 있으면 예외를 발생시킵니다.
+    (Collection(name, schema)는 스키마가 같으면 기존 컬렉션을 그대로 반환하므로,
+    확인하지 않으면 서비스 중인 컬렉션에 데이터를 덧붙일 수 있음)
+    """
+    if utility.has_collection(collection_name):
+        raise RuntimeError(f"'{collection_name}' 컬렉션이 이미 존재합니다.")
+    fields = [
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
+        FieldSchema(name="metadata", dtype=DataType.JSON),
+        FieldSchema(name="type", dtype=DataType.VARCHAR, max_length=10)
+    ]
+    schema = CollectionSchema(fields, description="뉴스 기사 및 주식 정보")
+    return Collection(name=collection_name, schema=schema)
+
+
+def current_version():
+    """alias가 현재 가리키는 버전 컬렉션 이름. 없으면 None."""
+    for name in utility.list_collections():
+        if name.startswith(VERSION_PREFIX) and COLLECTION_ALIAS in utility.list_aliases(name):
+            return name
+    return None
+
+
+def activate_version(collection_name):
+    """
+    alias를 collection_name으로 원자적으로 전환합니다.
+    인덱스 생성과 load가 끝난 컬렉션에 대해서만 호출해야 합니다.
+    이전 버전은 진행 중인 쿼리가 끝날 수 있도록 load 상태로 두고, drop_retired_versions에서
+    release/삭제합니다.
+
+    alias 도입 이전에 만들어진 'NewsPickStock' 실제 컬렉션이 남아 있으면, 같은 이름으로 alias를
+    만들 수 없으므로 먼저 삭제합니다. 이 마이그레이션은 최초 1회만 일어나며, 삭제와 alias 생성
+    사이의 짧은 순간에는 검색이 '컬렉션이 존재하지 않습니다' 오류를 반환합니다.
+    """
+    if COLLECTION_ALIAS in utility.list_collections():
+        # alias 도입 이전에 같은 이름으로 만들어진 컬렉션은 한 번만 정리 (1회성 검색 중단 구간)
+        utility.drop_collection(COLLECTION_ALIAS)
+        print(f"기존 '{COLLECTION_ALIAS}' 컬렉션을 삭제하고 alias로 전환합니다.")
+    if current_version() is None:
+        utility.create_alias(collection_name, COLLECTION_ALIAS)
+    else:
+        utility.alter_alias(collection_name, COLLECTION_ALIAS)
+    print(f"'{COLLECTION_ALIAS}' alias 전환 완료: {collection_name}")
+
+
+def ensure_index_and_load(collection):
+    """
+    인덱스가 없으면 HNSW 인덱스를 만들고, 빌드가 끝나면 컬렉션을 load합니다.
+    검색뿐 아니라 metadata 조건 delete도 내부적으로 query를 실행하므로 load가 필요합니다.
+    """
+    index_params = {
+        "metric_type": "IP", "index_type": "HNSW",
+        "params": {"M": 8, "efConstruction": 200}
+    }
+    if not collection.has_index():
+        collection.create_index(field_name="embedding", index_params=index_params)
+    utility.wait_for_index_building_complete(collection.name)
+    print(f"인덱스 생성 완료: {utility.index_building_progress(collection.name)}")
+    collection.load()
+    print("컬렉션 메모리 로드 완료.")
+
+
+def build_index_and_activate(collection):
+    """HNSW 인덱스를 만들고 빌드와 load가 끝나면 alias를 새 컬렉션으로 전환합니다."""
+    print("데이터 저장 및 인덱스 생성 시작...")
+    ensure_index_and_load(collection)
+
+    # 새 컬렉션이 준비된 뒤에 alias 전환
+    activate_version(collection.name)
+
+
+def drop_retired_versions(journal, grace_seconds=3600, release_seconds=60):
+    """
+    alias에서 내려온 버전 컬렉션을 정리합니다.
+    진행 중인 쿼리가 이전 버전을 끝까지 사용할 수 있도록, 내려온 뒤 release_seconds가 지나면
+    메모리에서 release하고, grace_seconds가 지나면 삭제합니다.
+    """
+    now = time.time()
+    active = current_version()
+    existing = set(utility.list_collections())
+
+    def retired(before):
+        return [name for name in journal.retired_collections(before)
+                if name != active and name in existing and name.startswith(VERSION_PREFIX)]
+
+    dropped = set()
+    for name in retired(now - grace_seconds):
+        utility.drop_collection(name)
+        dropped.add(name)
+        print(f"이전 버전 컬렉션 삭제 완료: {name}")
+    for name in retired(now - release_seconds):
+        if name not in dropped and utility.load_state(name) == LoadState.Loaded:
+            Collection(name).release()
+            print(f"이전 버전 컬렉션 release 완료: {name}")
+
+
+def start_retired_version_gc(journal_path="ingest_journal.db", grace_seconds=3600, release_seconds=60,
+                             interval_seconds=30):
+    """
+    alias에서 내려온 이전 버전 컬렉션을 주기적으로 release/삭제하는 데몬 스레드를 시작합니다.
+    시작 시 한 번 바로 실행하므로, 다음 적재를 기다리지 않고 서비스/앱 시작 시점에 정리됩니다.
+    """
+    def run():
+        while True:
+            try:
+                # sqlite 연결은 스레드 간에 공유하지 않으므로 매번 새로 열기
+                journal = IngestJournal(journal_path)
+                try:
+                    drop_retired_versions(journal, grace_seconds=grace_seconds, release_seconds=release_seconds)
+                finally:
+                    journal.close()
+            except Exception as e:
+                print(f"[이전 버전 정리 오류] {e}", flush=True)
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=run, name="retired-version-gc", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_search_collection():
+    """
+    검색에 사용할 alias 컬렉션을 반환합니다. 없으면 None.
+    alias는 서버에서 해석되므로 한 번 만든 객체는 버전이 바뀌어도 그대로 사용할 수 있습니다.
+    """
+    global _search_collection
+    if _search_collection is not None:
+        return _search_collection
+    with _search_collection_lock:
+        if _search_collection is None:
+            if not utility.has_collection(COLLECTION_ALIAS):
+                return None
+            collection = Collection(COLLECTION_ALIAS)
+            collection.load()
+            _search_collection = collection
+    return _search_collection
+
+
+def set_search_collection(collection):
+    """
+    get_search_collection()이 반환할 컬렉션을 직접 지정합니다.
+    Milvus 없이 OfflineCollection으로 검색 경로를 실행할 때 사용합니다. None이면 alias를 다시 조회합니다.
+    """
+    global _search_collection
+    with _search_collection_lock:
+        _search_collection = collection
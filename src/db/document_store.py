@@ -1,172 +1,252 @@
 import os
+import json
 from tqdm import tqdm
-from pymilvus import connections, FieldSchema, CollectionSchema, DataType, Collection, utility
+from pymilvus import connections, Collection, utility
 import time
-from utils.split_article_and_metadata import split_article_and_metadata
+from utils.parallel_parse import iter_parsed_files, rows_to_articles
 from utils.chunk_filter import is_irrelevant_chunk
+from utils import metrics
+from db.collection_alias import VERSION_PREFIX, new_version_name, create_collection, ensure_index_and_load, build_index_and_activate, drop_retired_versions
+from db.ingest_journal import IngestJournal, article_key, PARSED, SEGMENTED, EMBEDDED, INSERTING, INSERTED
+from db.ingest_progress import IngestProgress, IngestCancelled
 import diskcache
 
-def store_documents(segmentation_executor, embedding_executor, data_dir):
-    chunked_documents = []
-    doc_level_documents = []
-    txt_files = [f for f in os.listdir(data_dir) if f.endswith('.txt')]
+
+def delete_article_rows(collection, keys, batch_size=1000):
+    """article_key로 이전 실행에서 일부만 저장되었을 수 있는 행을 삭제합니다."""
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        collection.delete(expr=f'metadata["article_key"] in {json.dumps(batch)}')
+
+
+class BatchInserter:
+    """
+    기사 단위로 행을 모아 batch_size 이상이 되면 Milvus에 insert하고 저널에 기록합니다.
+    한 기사의 행(문서 + 청크)은 항상 같은 insert에 들어갑니다.
+    """
+
+    def __init__(self, collection, journal, run_id, progress, batch_size=500):
+        self._collection = collection
+        self._journal = journal
+        self._run_id = run_id
+        self._progress = progress
+        self._batch_size = batch_size
+        self._keys = []
+        self._columns = ([], [], [], [])
+        self.failed = 0
+
+    def add(self, key, rows):
+        texts, embeddings, metadatas, types = self._columns
+        for row in rows:
+            texts.append(row["text"])
+            embeddings.append(row["embedding"])
+            metadatas.append(row["metadata"])
+            types.append(row["type"])
+        self._keys.append(key)
+        if len(texts) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._keys:
+            return
+        keys, entities = self._keys, list(self._columns)
+        self._keys, self._columns = [], ([], [], [], [])
+        # insert 도중 중단되면 재시작 시 이 키들의 행을 지우고 다시 넣음
+        self._journal.mark_articles(self._run_id, keys, INSERTING)
+        try:
+            self._collection.insert(entities)
+        except Exception as e:
+            print(f"[Milvus insert 예외] {e}", flush=True)
+            self._journal.mark_articles(self._run_id, keys, EMBEDDED)
+            self.failed += len(keys)
+            self._progress.add("failed", len(keys))
+            return
+        self._journal.mark_articles(self._run_id, keys, INSERTED)
+        self._progress.add("inserted", len(keys))
+
+
+def store_documents(segmentation_executor, embedding_executor, data_dir, resume=True,
+                    journal_path="ingest_journal.db", retire_grace_seconds=3600, parse_workers=None, progress=None):
+    """
+    data_dir의 .txt 파일을 파싱, 분할, 임베딩하여 Milvus에 저장합니다.
+
+    기사 단위로 분할 -> 임베딩 -> insert를 바로 진행하고 그 상태를 적재 저널에 기록합니다.
+    resume=True이면 끝나지 않은 이전 실행을 이어받아 이미 저장된 기사를 건너뜁니다.
+
+    데이터는 새 버전 컬렉션에 쌓이고, 인덱스 생성과 load가 끝난 뒤에 검색용 alias를
+    전환하므로 재구축 중에도 기존 컬렉션으로 검색이 계속 처리됩니다.
+
+    .txt 파일 파싱은 parse_workers개(기본값: CPU 코어 수)의 프로세스에서 병렬로 진행됩니다.
+
+    모든 기사가 저장된 경우에만 alias를 전환하고 True를 반환합니다. 저장되지 않은 기사가 있으면
+    alias는 이전 버전에 그대로 두고 실행을 열어 둔 채 False를 반환합니다.
+
+    progress(IngestProgress)를 넘기면 단계별 처리 건수를 기록하고, 취소 요청 시
+    임베딩까지 끝난 기사를 저장한 뒤 IngestCancelled를 발생시킵니다.
+    """
+    progress = progress or IngestProgress()
+    progress.set_stage("준비 중")
+    txt_files = sorted(f for f in os.listdir(data_dir) if f.endswith('.txt'))
     total_articles = 0
 
     segmentation_cache = diskcache.Cache('segmentation_cache.db')
     embedding_cache = diskcache.Cache('embedding_cache.db')
+    journal = IngestJournal(journal_path)
 
-    for txt_file in txt_files:
-        file_path = os.path.join(data_dir, txt_file)
+    drop_retired_versions(journal, grace_seconds=retire_grace_seconds)
+    previous_run = journal.unfinished_run() if resume else None
+    if previous_run and previous_run[1].startswith(VERSION_PREFIX) and utility.has_collection(previous_run[1]):
+        run_id, collection_name = previous_run
+        collection = Collection(collection_name)
+        print(f"이전 적재 실행({run_id})을 이어서 진행합니다. 현재 상태: {journal.state_counts(run_id)}")
+        stale_keys = journal.keys_in_state(run_id, INSERTING)
+        if stale_keys:
+            # 중단된 실행의 컬렉션은 아직 인덱스/load 전이므로 delete 전에 준비
+            ensure_index_and_load(collection)
+            delete_article_rows(collection, stale_keys)
+            journal.mark_articles(run_id, stale_keys, EMBEDDED)
+            print(f"insert 도중 중단된 기사 {len(stale_keys)}개를 정리했습니다.")
+    else:
+        collection_name = new_version_name()
+        collection = create_collection(collection_name)
+        run_id = journal.start_run(collection_name)
+        print(f"새 버전 컬렉션 생성: {collection_name}")
+
+    inserter = BatchInserter(collection, journal, run_id, progress, batch_size=500)
+    incomplete_articles = 0
+
+    cache_lookups = metrics.counter("ingest_cache_lookups_total", "적재 시 segmentation/embedding 캐시 조회 수")
+
+    def get_embedding(text, label):
+        if text in embedding_cache:
+            cache_lookups.inc(cache="embedding", result="hit")
+            return embedding_cache[text]
+        cache_lookups.inc(cache="embedding", result="miss")
         try:
-            parsed_data = split_article_and_metadata(file_path)
+            response_data = embedding_executor.execute({"text": text})
+            embedding_cache[text] = response_data
+            return response_data
         except Exception as e:
-            print(f"[오류] {txt_file} 파일 파싱 실패: {e}")
-            continue
-        print(f"[{txt_file}]에서 {len(parsed_data)}개 기사 파싱 완료.")
-        total_articles += len(parsed_data)
-        for idx, (metadata, full_text) in enumerate(tqdm(parsed_data, desc=f"{txt_file} 뉴스 기사 분할 중")):
-            request_data = {
-    "alpha": -100,
-    "segCnt": -1,
-    "text": full_text,
-    "postProcess": False
-}
-            filtered_chunk_texts = []
-            # segmentation 캐시 적용
-            if full_text in segmentation_cache:
-                segmented_chunks = segmentation_cache[full_text]
-            else:
-                try:
-                    segmented_chunks = segmentation_executor.execute(request_data)
-                    segmentation_cache[full_text] = segmented_chunks
-                except Exception as e:
-                    print(f"  Segmentation Error: {e}")
-                    segmented_chunks = 'Error'
-            if segmented_chunks != 'Error':
+            print(f"  {label} 임베딩 오류: {e}")
+            return None
+
+    pending_files = []
+    for txt_file in txt_files:
+        if journal.file_state(run_id, txt_file) == INSERTED:
+            print(f"[{txt_file}] 이미 저장 완료된 파일이므로 건너뜁니다.")
+        else:
+            pending_files.append(os.path.join(data_dir, txt_file))
+
+    progress.set_stage("문서 적재 중")
+    try:
+        # 파일 파싱은 프로세스 풀에서 미리 진행하고, 결과는 파일 순서대로 받아서 적재
+        for file_path, parsed_rows, parse_error in iter_parsed_files(pending_files, max_workers=parse_workers):
+            progress.check_cancelled()
+            txt_file = os.path.basename(file_path)
+            if parse_error:
+                print(f"[오류] {txt_file} 파일 파싱 실패: {parse_error}")
+                continue
+            parsed_data = rows_to_articles(parsed_rows)
+            print(f"[{txt_file}]에서 {len(parsed_data)}개 기사 파싱 완료.")
+            total_articles += len(parsed_data)
+            progress.add("parsed", len(parsed_data))
+            keys = [article_key(metadata, full_text) for metadata, full_text in parsed_data]
+            journal.register_articles(run_id, keys, txt_file)
+            journal.mark_file(run_id, txt_file, PARSED, len(parsed_data))
+            article_records = journal.article_records(run_id, keys)
+            handled_keys = set()
+            file_complete = True
+
+            for key, (metadata, full_text) in zip(keys, tqdm(parsed_data, desc=f"{txt_file} 뉴스 기사 적재 중")):
+                progress.check_cancelled()
+                owner_file, state = article_records[key]
+                if owner_file != txt_file or key in handled_keys:
+                    # 메타데이터와 본문이 같은 기사가 다른 파일(또는 같은 파일)에 반복된 경우 한 번만 저장.
+                    # 중복 행을 넣으면 중단 후 재시작 시 article_key 기준 삭제가 다른 파일의 행까지 지움
+                    progress.add("skipped")
+                    continue
+                handled_keys.add(key)
+                if state == INSERTED:
+                    progress.add("skipped")
+                    continue
+                metadata = {**metadata, "article_key": key}
+                request_data = {
+        "alpha": -100,
+        "segCnt": -1,
+        "text": full_text,
+        "postProcess": False
+    }
+                # segmentation 캐시 적용
+                segmented_chunks = segmentation_cache.get(full_text, 'Error')
+                cache_lookups.inc(cache="segmentation", result="miss" if segmented_chunks == 'Error' else "hit")
+                if segmented_chunks == 'Error':
+                    try:
+                        segmented_chunks = segmentation_executor.execute(request_data)
+                    except Exception as e:
+                        print(f"  Segmentation Error: {e}")
+                        segmented_chunks = 'Error'
+                    # 실패 결과는 캐시하지 않아야 재실행 시 다시 시도됨
+                    if segmented_chunks != 'Error':
+                        segmentation_cache[full_text] = segmented_chunks
+                if segmented_chunks == 'Error':
+                    print(f"  문단 나누기 API 호출 실패")
+                    incomplete_articles += 1
+                    progress.add("failed")
+                    file_complete = False
+                    continue
+                filtered_chunk_texts = []
                 for chunk in segmented_chunks:
                     chunk_text = chunk if isinstance(chunk, str) else ' '.join(chunk)
-                    if is_irrelevant_chunk(chunk_text):
-                        continue
-                    chunked_documents.append({
-                        "text": chunk_text,
-                        "metadata": metadata,
-                        "type": "chunk"
-                    })
-                    filtered_chunk_texts.append(chunk_text)
-            else:
-                print(f"  문단 나누기 API 호출 실패")
-            filtered_full_text = '\n'.join(filtered_chunk_texts)
-            doc_level_documents.append({
-                "text": filtered_full_text,
-                "metadata": metadata,
-                "type": "doc"
-            })
+                    if not is_irrelevant_chunk(chunk_text):
+                        filtered_chunk_texts.append(chunk_text)
+                journal.mark_articles(run_id, [key], SEGMENTED)
+                progress.add("segmented")
+
+                # 전체 임베딩 + 청크 임베딩 (캐시 적용)
+                filtered_full_text = '\n'.join(filtered_chunk_texts)
+                rows = [{"text": filtered_full_text, "metadata": metadata, "type": "doc",
+                         "embedding": get_embedding(filtered_full_text[:8192], "전체")}]
+                for chunk_text in filtered_chunk_texts:
+                    if len(chunk_text) > 9000:
+                        print(f"[경고] 청크 임베딩 본문 길이 초과({len(chunk_text)}자):\n앞500: {chunk_text[:500]}\n... [중략] ...\n뒤500: {chunk_text[-500:]}", flush=True)
+                        continue  # 저장하지 않음
+                    rows.append({"text": chunk_text, "metadata": metadata, "type": "chunk",
+                                 "embedding": get_embedding(chunk_text, "청크")})
+                if any(row["embedding"] is None for row in rows):
+                    # 임베딩이 하나라도 실패하면 저장하지 않고 다음 실행에서 재시도
+                    incomplete_articles += 1
+                    progress.add("failed")
+                    file_complete = False
+                    continue
+                journal.mark_articles(run_id, [key], EMBEDDED)
+                progress.add("embedded")
+                inserter.add(key, rows)
+
+            inserter.flush()
+            if file_complete and not inserter.failed:
+                journal.mark_file(run_id, txt_file, INSERTED)
+    except IngestCancelled:
+        # 임베딩까지 끝난 기사는 저장해 두고 종료 (다음 실행에서 이어서 진행)
+        inserter.flush()
+        journal.close()
+        raise
     print(f"총 {total_articles}개의 뉴스 기사 파싱 완료.")
+    print(f"기사 적재 상태: {journal.state_counts(run_id)}")
 
-    # 전체 임베딩 캐시 적용
-    for didx, doc in enumerate(tqdm(doc_level_documents, desc="전체 임베딩 생성 중")):
-        text = doc['text']
-        truncated_text = text[:8192] if len(text) > 8192 else text
-        if truncated_text in embedding_cache:
-            doc["embedding"] = embedding_cache[truncated_text]
-        else:
-            try:
-                request_json = {"text": truncated_text}
-                response_data = embedding_executor.execute(request_json)
-                doc["embedding"] = response_data
-                embedding_cache[truncated_text] = response_data
-            except Exception as e:
-                print(f"  전체 임베딩 오류: {e}")
-
-    # 청크 임베딩 캐시 적용
-    for cidx, chunked_document in enumerate(tqdm(chunked_documents, desc="청크 임베딩 생성 중")):
-        text = chunked_document['text']
-        if text in embedding_cache:
-            chunked_document["embedding"] = embedding_cache[text]
-        else:
-            try:
-                request_json = {"text": text}
-                response_data = embedding_executor.execute(request_json)
-                chunked_document["embedding"] = response_data
-                embedding_cache[text] = response_data
-            except Exception as e:
-                print(f"  청크 임베딩 오류: {e}")
-
-    collection_name = "NewsPickStock"
-    if utility.has_collection(collection_name):
-        utility.drop_collection(collection_name)
-        print(f"기존 컬렉션 삭제 완료.")
-
-    fields = [
-        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1024),
-        FieldSchema(name="metadata", dtype=DataType.JSON),
-        FieldSchema(name="type", dtype=DataType.VARCHAR, max_length=10)
-    ]
-    schema = CollectionSchema(fields, description="뉴스 기사 및 주식 정보")
-    collection = Collection(name=collection_name, schema=schema)
-
-    batch_size = 500
-    # 전체 임베딩 batch insert
-    batch_texts, batch_embeddings, batch_metadatas, batch_types = [], [], [], []
-    for didx, doc in enumerate(tqdm(doc_level_documents, desc="전체 임베딩 DB 저장 중")):
-        if "embedding" in doc:
-            text = doc['text']
-            batch_texts.append(doc['text'])
-            batch_embeddings.append(doc['embedding'])
-            batch_metadatas.append(doc['metadata'])
-            batch_types.append(doc['type'])
-            if len(batch_texts) == batch_size:
-                entities = [batch_texts, batch_embeddings, batch_metadatas, batch_types]
-                try:
-                    collection.insert(entities)
-                except Exception as e:
-                    print(f"[Milvus insert 예외] {e}", flush=True)
-                batch_texts, batch_embeddings, batch_metadatas, batch_types = [], [], [], []
-    # 마지막 남은 것 insert
-    if batch_texts:
-        entities = [batch_texts, batch_embeddings, batch_metadatas, batch_types]
-        try:
-            collection.insert(entities)
-        except Exception as e:
-            print(f"[Milvus insert 예외] {e}", flush=True)
-    print(f"전체 임베딩 저장 완료.")
-
-    # 청크 임베딩 batch insert
-    batch_texts, batch_embeddings, batch_metadatas, batch_types = [], [], [], []
-    for didx, item in enumerate(tqdm(chunked_documents, desc="청크 임베딩 DB 저장 중")):
-        if "embedding" in item:
-            text = item['text']
-            if len(text) > 9000:
-                print(f"[경고] 청크 임베딩 본문 길이 초과({len(text)}자):\n앞500: {text[:500]}\n... [중략] ...\n뒤500: {text[-500:]}", flush=True)
-                continue  # 저장하지 않음
-            batch_texts.append(item['text'])
-            batch_embeddings.append(item['embedding'])
-            batch_metadatas.append(item['metadata'])
-            batch_types.append(item['type'])
-            if len(batch_texts) == batch_size:
-                entities = [batch_texts, batch_embeddings, batch_metadatas, batch_types]
-                try:
-                    collection.insert(entities)
-                except Exception as e:
-                    print(f"[Milvus insert 예외] {e}", flush=True)
-                batch_texts, batch_embeddings, batch_metadatas, batch_types = [], [], [], []
-    # 마지막 남은 것 insert
-    if batch_texts:
-        entities = [batch_texts, batch_embeddings, batch_metadatas, batch_types]
-        try:
-            collection.insert(entities)
-        except Exception as e:
-            print(f"[Milvus insert 예외] {e}", flush=True)
-    print(f"청크 임베딩 저장 완료.")
+    if incomplete_articles or inserter.failed:
+        # 일부 기사가 빠진 버전으로 alias를 전환하면 검색 결과가 비거나 줄어들므로,
+        # 검색은 이전 버전으로 계속 처리하고 이번 실행은 이어서 진행할 수 있도록 열어 둠
+        print(f"[경고] 저장되지 않은 기사 {incomplete_articles + inserter.failed}개가 있습니다. "
+              f"검색 alias는 이전 버전을 유지하며, 다시 실행하면 해당 기사만 이어서 처리합니다.")
+        journal.close()
+        progress.set_stage("미완료 (다시 실행하면 이어서 진행)")
+        return False
 
-    print("데이터 저장 및 인덱스 생성 시작...")
-    index_params = {
-        "metric_type": "IP", "index_type": "HNSW",
-        "params": {"M": 8, "efConstruction": 200}
-    }
-    collection.create_index(field_name="embedding", index_params=index_params)
-    utility.index_building_progress(collection_name)
-    print("인덱스 생성 완료 및 컬렉션 메모리 로드 완료.")
-    collection.load() 
\ No newline at end of file
+    progress.set_stage("인덱스 생성 및 전환 중")
+    build_index_and_activate(collection)
+    journal.activate_run(run_id)
+    journal.finish_run(run_id)
+    drop_retired_versions(journal, grace_seconds=retire_grace_seconds)
+    journal.close()
+    progress.set_stage("완료")
+    return True
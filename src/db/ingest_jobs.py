@@ -0,0 +1,101 @@
+import threading
+import traceback
+import uuid
+
+from db.ingest_progress import IngestProgress, IngestCancelled
+
+# 작업 상태
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+INCOMPLETE = "incomplete"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class IngestJob:
+    """
+    store_documents를 백그라운드 스레드에서 실행하는 적재 작업.
+    UI는 snapshot()을 주기적으로 읽어 진행 상황을 표시하고, cancel()로 중단을 요청합니다.
+    """
+
+    def __init__(self, segmentation_executor, embedding_executor, data_dir, **kwargs):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.data_dir = data_dir
+        self.progress = IngestProgress()
+        self.status = RUNNING
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(segmentation_executor, embedding_executor, data_dir),
+            kwargs=kwargs,
+            name=f"ingest-{self.job_id}",
+            daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self, segmentation_executor, embedding_executor, data_dir, **kwargs):
+        # 적재 모듈(diskcache, tqdm, 파싱 프로세스 풀)은 작업이 실제로 시작될 때 불러옴
+        from db.document_store import store_documents
+
+        try:
+            completed = store_documents(segmentation_executor, embedding_executor, data_dir,
+                                        progress=self.progress, **kwargs)
+            self.status = SUCCEEDED if completed else INCOMPLETE
+        except IngestCancelled:
+            self.progress.set_stage("취소됨")
+            self.status = CANCELLED
+        except Exception as e:
+            traceback.print_exc()
+            self.progress.set_stage("실패")
+            self.error = str(e)
+            self.status = FAILED
+        finally:
+            self.progress.finish()
+
+    @property
+    def running(self):
+        return self.status == RUNNING
+
+    def cancel(self):
+        """취소를 요청합니다. 처리 중인 기사까지 저장한 뒤 작업이 종료됩니다."""
+        self.progress.cancel()
+
+    def snapshot(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "cancel_requested": self.progress.cancel_requested,
+            **self.progress.snapshot(),
+        }
+
+
+class IngestJobRegistry:
+    """
+    적재 작업 목록을 관리합니다. 같은 컬렉션을 동시에 재구축하지 않도록
+    실행 중인 작업이 있으면 새로 시작하지 않고 그 작업을 반환합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._latest_id = None
+
+    def start(self, segmentation_executor, embedding_executor, data_dir, **kwargs):
+        with self._lock:
+            latest = self._jobs.get(self._latest_id)
+            if latest is not None and latest.running:
+                return latest
+            job = IngestJob(segmentation_executor, embedding_executor, data_dir, **kwargs)
+            self._jobs[job.job_id] = job
+            self._latest_id = job.job_id
+        return job.start()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def latest(self):
+        return self._jobs.get(self._latest_id)
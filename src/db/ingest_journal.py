@@ -0,0 +1,216 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# 실행 종류: store_documents 적재 / 스냅샷 가져오기
+INGEST_RUN = "ingest"
+SNAPSHOT_RUN = "snapshot"
+
+# 기사 단위 적재 상태 (순서대로 진행)
+PARSED = "parsed"
+SEGMENTED = "segmented"
+EMBEDDED = "embedded"
+INSERTING = "inserting"
+INSERTED = "inserted"
+
+
+def article_key(metadata, full_text):
+    """메타데이터와 본문으로 기사를 식별하는 고정 길이 키를 만듭니다."""
+    payload = json.dumps(metadata, sort_keys=True, ensure_ascii=False) + "\n" + full_text
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class IngestJournal:
+    """
+    store_documents의 진행 상황을 SQLite 파일에 기록하는 적재 저널.
+
+    실행(run) 단위로 대상 컬렉션과 파일/기사별 상태(parsed, segmented, embedded,
+    inserting, inserted)를 남기므로, 중단된 실행을 다시 시작하면 이미 저장된
+    기사는 건너뛰고 남은 부분부터 이어서 적재할 수 있습니다.
+
+    Args:
+        path (str): 저널 SQLite 파일 경로
+    """
+
+    def __init__(self, path="ingest_journal.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                activated_at REAL,
+                retired_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                run_id INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                state TEXT NOT NULL,
+                article_count INTEGER,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, file_name)
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                run_id INTEGER NOT NULL,
+                article_key TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, article_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_state ON articles (run_id, state);
+        """)
+        # kind 컬럼 도입 이전에 만든 저널은 모두 store_documents 실행이므로 기본값으로 채움
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "kind" not in columns:
+            self._conn.execute(f"ALTER TABLE runs ADD COLUMN kind TEXT NOT NULL DEFAULT '{INGEST_RUN}'")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- 실행(run) 단위 ---
+    def unfinished_run(self, kind=INGEST_RUN):
+        """kind 종류의 가장 최근 끝나지 않은 실행을 (run_id, collection)으로 반환합니다. 없으면 None."""
+        rows = self._query(
+            "SELECT run_id, collection FROM runs WHERE finished_at IS NULL AND kind = ? ORDER BY run_id DESC LIMIT 1",
+            (kind,)
+        )
+        return rows[0] if rows else None
+
+    def start_run(self, collection_name, kind=INGEST_RUN):
+        """
+        새 실행을 시작합니다. 같은 종류의 끝나지 않은 이전 실행은 더 이상 이어받지 않도록 닫습니다.
+        다른 종류의 실행(예: 적재 중 가져오는 스냅샷)은 건드리지 않습니다.
+        """
+        now = time.time()
+        # 서비스된 적 없는(alias 전환 전) 실행의 컬렉션은 바로 정리 대상이 됨
+        self._execute(
+            "UPDATE runs SET retired_at = ? WHERE finished_at IS NULL AND activated_at IS NULL AND kind = ?",
+            (now, kind)
+        )
+        self._execute("UPDATE runs SET finished_at = ? WHERE finished_at IS NULL AND kind = ?", (now, kind))
+        cursor = self._execute(
+            "INSERT INTO runs (collection, started_at, kind) VALUES (?, ?, ?)", (collection_name, now, kind)
+        )
+        return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        self._execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def abandon_run(self, run_id):
+        """실패한 실행을 닫고, 서비스된 적 없는 컬렉션이면 정리 대상으로 표시합니다."""
+        now = time.time()
+        self._execute(
+            """UPDATE runs SET finished_at = ?,
+                   retired_at = CASE WHEN activated_at IS NULL THEN ? ELSE retired_at END
+               WHERE run_id = ?""",
+            (now, now, run_id)
+        )
+
+    def activate_run(self, run_id):
+        """run_id의 컬렉션이 alias에 연결되었음을 기록하고, 이전에 서비스되던 실행은 내려감으로 표시합니다."""
+        now = time.time()
+        self._execute(
+            """UPDATE runs SET retired_at = ?
+               WHERE run_id != ? AND activated_at IS NOT NULL AND retired_at IS NULL""",
+            (now, run_id)
+        )
+        self._execute("UPDATE runs SET activated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def retired_collections(self, retired_before):
+        """retired_before 시각 이전에 내려간 실행들의 컬렉션 이름"""
+        rows = self._query(
+            "SELECT DISTINCT collection FROM runs WHERE retired_at IS NOT NULL AND retired_at < ?",
+            (retired_before,)
+        )
+        return [row[0] for row in rows]
+
+    # --- 파일 단위 ---
+    def file_state(self, run_id, file_name):
+        rows = self._query(
+            "SELECT state FROM files WHERE run_id = ? AND file_name = ?", (run_id, file_name)
+        )
+        return rows[0][0] if rows else None
+
+    def mark_file(self, run_id, file_name, state, article_count=None):
+        self._execute(
+            """INSERT INTO files (run_id, file_name, state, article_count, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (run_id, file_name) DO UPDATE SET
+                   state = excluded.state,
+                   article_count = COALESCE(excluded.article_count, files.article_count),
+                   updated_at = excluded.updated_at""",
+            (run_id, file_name, state, article_count, time.time())
+        )
+
+    # --- 기사 단위 ---
+    def article_records(self, run_id, keys, batch_size=500):
+        """
+        keys의 {article_key: (file_name, state)} 딕셔너리.
+        file_name은 그 기사를 처음 등록한(저장을 담당하는) 파일입니다.
+        """
+        records = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            rows = self._query(
+                f"""SELECT article_key, file_name, state FROM articles
+                    WHERE run_id = ? AND article_key IN ({','.join('?' * len(batch))})""",
+                (run_id, *batch)
+            )
+            records.update((key, (file_name, state)) for key, file_name, state in rows)
+        return records
+
+    def register_articles(self, run_id, keys, file_name):
+        """
+        파싱된 기사들을 parsed 상태로 등록합니다. 이미 기록된 기사의 상태와 담당 파일은 유지하므로,
+        같은 기사가 여러 파일에 있으면 처음 등록한 파일에서만 저장됩니다.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO articles (run_id, article_key, file_name, state, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(run_id, key, file_name, PARSED, now) for key in keys]
+            )
+            self._conn.commit()
+
+    def mark_articles(self, run_id, keys, state):
+        """여러 기사의 상태를 한 트랜잭션으로 갱신합니다."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE articles SET state = ?, updated_at = ? WHERE run_id = ? AND article_key = ?",
+                [(state, now, run_id, key) for key in keys]
+            )
+            self._conn.commit()
+
+    def keys_in_state(self, run_id, state):
+        rows = self._query(
+            "SELECT article_key FROM articles WHERE run_id = ? AND state = ?", (run_id, state)
+        )
+        return [row[0] for row in rows]
+
+    def state_counts(self, run_id):
+        """상태별 기사 수"""
+        return dict(self._query(
+            "SELECT state, COUNT(*) FROM articles WHERE run_id = ? GROUP BY state", (run_id,)
+        ))
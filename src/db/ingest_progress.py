@@ -0,0 +1,60 @@
+import threading
+import time
+
+# store_documents가 기록하는 기사 단위 카운터
+PROGRESS_COUNTERS = ("parsed", "skipped", "segmented", "embedded", "inserted", "failed")
+
+
+class IngestCancelled(Exception):
+    """적재 작업이 취소 요청으로 중단되었을 때 발생합니다."""
+
+
+class IngestProgress:
+    """
+    store_documents의 단계별 진행 상황과 취소 요청을 스레드 간에 공유합니다.
+    적재 스레드는 add/set_stage/check_cancelled를 호출하고, UI는 snapshot을 주기적으로 읽습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._counts = dict.fromkeys(PROGRESS_COUNTERS, 0)
+        self.started_at = time.time()
+        self.finished_at = None
+        self.stage = "대기 중"
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+    def add(self, counter, amount=1):
+        with self._lock:
+            self._counts[counter] += amount
+
+    def finish(self):
+        """작업 종료 시각을 기록하여 이후 경과 시간/처리량이 고정되도록 합니다."""
+        self.finished_at = time.time()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise IngestCancelled("사용자 요청으로 적재 작업이 취소되었습니다.")
+
+    def snapshot(self):
+        """단계, 경과 시간(초), 카운터별 누적 값과 초당 처리량"""
+        with self._lock:
+            counts = dict(self._counts)
+            stage = self.stage
+        elapsed = max((self.finished_at or time.time()) - self.started_at, 1e-9)
+        return {
+            "stage": stage,
+            "elapsed": elapsed,
+            "counts": counts,
+            "rates": {name: value / elapsed for name, value in counts.items()},
+        }
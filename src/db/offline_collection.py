@@ -0,0 +1,131 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.chunk_filter import is_irrelevant_chunk
+from utils.split_article_and_metadata import split_article_and_metadata
+
+# 검색 경로에서 사용하는 필터 형식만 지원: type == 'doc' / type == 'chunk'
+TYPE_EXPR = re.compile(r"^\s*type\s*==\s*'(\w+)'\s*$")
+
+
+class OfflineEntity:
+    """pymilvus Hit.entity처럼 속성과 get()으로 필드를 읽을 수 있는 객체"""
+
+    def __init__(self, row, output_fields):
+        for field in output_fields:
+            setattr(self, field, row.get(field))
+
+    def get(self, field):
+        return getattr(self, field, None)
+
+
+class OfflineHit:
+    def __init__(self, row_id, distance, entity):
+        self.id = row_id
+        self.distance = distance
+        self.entity = entity
+
+
+class OfflineHits(list):
+    """pymilvus Hits처럼 ids/distances 속성을 제공하는 hit 리스트"""
+
+    @property
+    def ids(self):
+        return [hit.id for hit in self]
+
+    @property
+    def distances(self):
+        return [hit.distance for hit in self]
+
+
+class OfflineCollection:
+    """
+    Milvus 없이 검색 경로를 실행하기 위한 메모리 내 컬렉션.
+    collection.search와 같은 인자를 받아 내적(IP) 전수 검색을 수행합니다.
+
+    Args:
+        name (str): 컬렉션 이름
+        delay (float): search 호출마다 대기할 시간 (초). Milvus 왕복 지연을 흉내 냅니다.
+
+    Attributes:
+        search_calls (list): search 호출마다 함께 검색한 벡터 수 (배치 검색 확인용)
+    """
+
+    def __init__(self, name="NewsPickStock_offline", delay=0.0):
+        self.name = name
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._rows = []
+        self._vectors = []
+        self.search_calls = []
+
+    @property
+    def num_entities(self):
+        return len(self._rows)
+
+    def load(self):
+        pass
+
+    def insert_rows(self, rows):
+        """rows: text, embedding, metadata, type 키를 가진 딕셔너리 리스트"""
+        with self._lock:
+            for row in rows:
+                self._rows.append({"id": len(self._rows), "text": row["text"],
+                                   "metadata": row["metadata"], "type": row["type"]})
+                self._vectors.append(np.asarray(row["embedding"], dtype=np.float32))
+
+    def search(self, data, anns_field, param, limit, output_fields=None, expr=None):
+        with self._lock:
+            self.search_calls.append(len(data))
+            rows = self._rows
+            matrix = np.vstack(self._vectors) if self._vectors else np.zeros((0, len(data[0])), dtype=np.float32)
+        if self._delay:
+            time.sleep(self._delay)
+
+        if expr:
+            match = TYPE_EXPR.match(expr)
+            if match is None:
+                raise ValueError(f"오프라인 컬렉션에서 지원하지 않는 expr입니다: {expr}")
+            candidates = np.array([i for i, row in enumerate(rows) if row["type"] == match.group(1)], dtype=np.int64)
+        else:
+            candidates = np.arange(len(rows))
+
+        output_fields = output_fields or []
+        scores = np.asarray(data, dtype=np.float32) @ matrix[candidates].T if len(candidates) else None
+        results = []
+        for i in range(len(data)):
+            hits = OfflineHits()
+            if scores is not None:
+                for j in np.argsort(-scores[i])[:limit]:
+                    row = rows[candidates[j]]
+                    hits.append(OfflineHit(row["id"], float(scores[i][j]), OfflineEntity(row, output_fields)))
+            results.append(hits)
+        return results
+
+
+def load_offline_collection(data_dir, segmentation_executor, embedding_executor, delay=0.0):
+    """
+    data_dir의 .txt 파일을 store_documents와 같은 방식(문서 + 필터링된 청크)으로
+    OfflineCollection에 적재합니다. 캐시와 저널은 사용하지 않습니다.
+    """
+    collection = OfflineCollection(delay=delay)
+    txt_files = sorted(f for f in os.listdir(data_dir) if f.endswith('.txt')) if os.path.isdir(data_dir) else []
+    for txt_file in txt_files:
+        for metadata, full_text in split_article_and_metadata(os.path.join(data_dir, txt_file)):
+            segmented_chunks = segmentation_executor.execute({"text": full_text})
+            if segmented_chunks == 'Error':
+                continue
+            chunk_texts = [chunk if isinstance(chunk, str) else ' '.join(chunk) for chunk in segmented_chunks]
+            chunk_texts = [text for text in chunk_texts if not is_irrelevant_chunk(text)]
+            filtered_full_text = '\n'.join(chunk_texts)
+            rows = [{"text": filtered_full_text, "metadata": metadata, "type": "doc",
+                     "embedding": embedding_executor.execute({"text": filtered_full_text[:8192]})}]
+            rows += [{"text": text, "metadata": metadata, "type": "chunk",
+                      "embedding": embedding_executor.execute({"text": text})} for text in chunk_texts]
+            collection.insert_rows(rows)
+    print(f"오프라인 컬렉션 적재 완료: {len(txt_files)}개 파일, {collection.num_entities}개 행")
+    return collection
@@ -0,0 +1,83 @@
+import json
+import threading
+from concurrent.futures import Future
+
+from db.collection_alias import COLLECTION_ALIAS, get_search_collection
+from utils import metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class SearchBatcher:
+    """
+    여러 요청에서 동시에 들어오는 벡터 검색을 짧은 시간 창(window) 동안 모아
+    하나의 collection.search 호출로 묶어 실행합니다.
+
+    같은 검색 조건(expr, limit, output_fields, param)을 가진 벡터끼리만 묶이며,
+    호출한 스레드는 자신의 결과가 준비될 때까지 블로킹됩니다.
+
+    Args:
+        window_ms (float): 첫 요청 이후 배치를 모으는 최대 대기 시간 (밀리초)
+        max_batch (int): 한 번의 search 호출에 담을 최대 벡터 수
+    """
+
+    def __init__(self, window_ms=5.0, max_batch=64):
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @property
+    def queue_depth(self):
+        """아직 search 호출로 보내지지 않은 벡터 수"""
+        with self._lock:
+            return sum(len(items) for items in self._pending.values())
+
+    def search(self, vector, param, limit, output_fields, expr=None):
+        """단일 벡터 검색을 배치에 등록하고 해당 벡터의 hit 목록을 반환합니다."""
+        key = (expr, limit, tuple(output_fields), json.dumps(param, sort_keys=True))
+        future = Future()
+        flush_now = None
+        with self._lock:
+            items = self._pending.setdefault(key, [])
+            items.append((vector, future))
+            if len(items) == 1:
+                timer = threading.Timer(self._window, self._flush, args=(key, items))
+                timer.daemon = True
+                timer.start()
+            elif len(items) >= self._max_batch:
+                flush_now = self._pending.pop(key)
+        if flush_now:
+            self._run(key, flush_now)
+        return future.result()
+
+    def _flush(self, key, items):
+        with self._lock:
+            # max_batch로 이미 실행된 배치라면 새로 쌓인 배치를 건드리지 않음
+            if self._pending.get(key) is not items:
+                return
+            del self._pending[key]
+        self._run(key, items)
+
+    def _run(self, key, items):
+        expr, limit, output_fields, param = key
+        try:
+            collection = get_search_collection()
+            if collection is None:
+                raise RuntimeError(f"'{COLLECTION_ALIAS}' 컬렉션이 존재하지 않습니다.")
+            metrics.histogram("search_batch_size", "배치 검색 1회당 벡터 수", BATCH_SIZE_BUCKETS).observe(len(items))
+            with metrics.timer("search_batch_seconds", "배치 검색 1회 실행 시간"):
+                results = collection.search(
+                    data=[vector for vector, _ in items],
+                    anns_field="embedding",
+                    param=json.loads(param),
+                    limit=limit,
+                    output_fields=list(output_fields),
+                    expr=expr
+                )
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), hits in zip(items, results):
+            future.set_result(hits)
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymilvus import connections, Collection
+from tqdm import tqdm
+
+from db.collection_alias import COLLECTION_ALIAS, new_version_name, create_collection, build_index_and_activate, drop_retired_versions
+from db.ingest_journal import IngestJournal, INGEST_RUN, SNAPSHOT_RUN
+
+EMBEDDINGS_FILE = "embeddings.npy"
+ROWS_FILE = "rows.parquet"
+MANIFEST_FILE = "manifest.json"
+EMBEDDING_DIM = 1024
+
+
+def export_snapshot(snapshot_dir, collection_name=COLLECTION_ALIAS, dtype="float32", batch_size=5000):
+    """
+    컬렉션의 벡터와 id/스칼라 필드를 스냅샷 디렉터리로 내보냅니다.
+
+    - embeddings.npy: (행 수, 1024) float32/float16 배열 (np.load(mmap_mode='r')로 바로 매핑 가능)
+    - rows.parquet: 같은 순서의 id, type, text, metadata(JSON 문자열)
+    - manifest.json: 원본 컬렉션, dtype, 행 수 등
+
+    Args:
+        snapshot_dir (str): 스냅샷을 저장할 디렉터리
+        collection_name (str): 내보낼 컬렉션(또는 alias) 이름
+        dtype (str): 벡터 저장 타입 ('float32' 또는 'float16')
+        batch_size (int): query_iterator 배치 크기
+
+    Returns:
+        int: 내보낸 행 수
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"지원하지 않는 dtype입니다: {dtype}")
+    started = time.time()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    collection = Collection(collection_name)
+    collection.load()
+
+    # num_entities는 flush된 segment만 세지만 query_iterator는 flush 전 행도 반환하므로,
+    # 내보낼 행 수는 삭제 행을 제외하고 flush 여부와 무관한 count(*)로 구함
+    capacity = collection.query(expr="", output_fields=["count(*)"], consistency_level="Strong")[0]["count(*)"]
+    embeddings_path = os.path.join(snapshot_dir, EMBEDDINGS_FILE)
+    vectors = np.lib.format.open_memmap(embeddings_path, mode="w+", dtype=dtype, shape=(capacity, EMBEDDING_DIM))
+    ids, types, texts, metadatas = [], [], [], []
+
+    iterator = collection.query_iterator(
+        batch_size=batch_size,
+        output_fields=["id", "type", "text", "metadata", "embedding"]
+    )
+    count = 0
+    with tqdm(total=capacity, desc="스냅샷 내보내는 중") as progress:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            if count + len(batch) > capacity:
+                raise RuntimeError("내보내는 도중 컬렉션에 행이 추가되었습니다. 적재가 끝난 뒤 다시 시도해주세요.")
+            vectors[count:count + len(batch)] = [row["embedding"] for row in batch]
+            for row in batch:
+                ids.append(row["id"])
+                types.append(row["type"])
+                texts.append(row["text"])
+                metadatas.append(json.dumps(row["metadata"], ensure_ascii=False))
+            count += len(batch)
+            progress.update(len(batch))
+    vectors.flush()
+    del vectors
+
+    if count < capacity:
+        # count(*) 이후 행이 삭제된 경우 실제 행 수만큼 잘라서 다시 저장
+        full = np.load(embeddings_path, mmap_mode="r")
+        trimmed_path = embeddings_path + ".tmp"
+        trimmed = np.lib.format.open_memmap(trimmed_path, mode="w+", dtype=dtype, shape=(count, EMBEDDING_DIM))
+        trimmed[:] = full[:count]
+        trimmed.flush()
+        del trimmed, full
+        os.replace(trimmed_path, embeddings_path)
+
+    table = pa.table({
+        "id": pa.array(ids, type=pa.int64()),
+        "type": pa.array(types, type=pa.string()),
+        "text": pa.array(texts, type=pa.string()),
+        "metadata": pa.array(metadatas, type=pa.string()),
+    })
+    pq.write_table(table, os.path.join(snapshot_dir, ROWS_FILE), compression="zstd")
+
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "source_collection": collection_name,
+            "count": count,
+            "dim": EMBEDDING_DIM,
+            "dtype": dtype,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"스냅샷 내보내기 완료: {count}행, {time.time() - started:.1f}초 ({snapshot_dir})")
+    return count
+
+
+def import_snapshot(snapshot_dir, batch_size=5000, journal_path="ingest_journal.db", retire_grace_seconds=3600):
+    """
+    스냅샷을 새 버전 컬렉션에 대량 insert하고 인덱스 생성 후 alias를 전환합니다.
+    임베딩 API는 호출하지 않습니다.
+
+    Args:
+        snapshot_dir (str): export_snapshot으로 만든 디렉터리
+        batch_size (int): insert 한 번에 넣을 행 수
+        journal_path (str): 버전 전환 기록을 남길 적재 저널 경로
+        retire_grace_seconds (int): 이전 버전 컬렉션을 삭제하기 전 유예 시간
+
+    Returns:
+        str: 새로 만든 컬렉션 이름
+
+    이어서 진행할 store_documents 실행이 남아 있으면 가져오지 않습니다. 가져오는 도중 실패하면
+    실행을 닫고 새 컬렉션을 정리 대상으로 표시하므로, alias는 이전 버전에 그대로 남습니다.
+    """
+    started = time.time()
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    vectors = np.load(os.path.join(snapshot_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    table = pq.read_table(os.path.join(snapshot_dir, ROWS_FILE), columns=["type", "text", "metadata"])
+    if len(vectors) != table.num_rows or len(vectors) != manifest["count"]:
+        raise ValueError(f"스냅샷 파일의 행 수가 일치하지 않습니다: 벡터 {len(vectors)}, 메타데이터 {table.num_rows}")
+
+    journal = IngestJournal(journal_path)
+    pending = journal.unfinished_run(kind=INGEST_RUN)
+    if pending is not None:
+        # 적재 중인 컬렉션을 닫아 버리면 정리(GC) 대상이 되어 작성 도중 삭제될 수 있음
+        journal.close()
+        raise RuntimeError(
+            f"끝나지 않은 적재 실행({pending[0]}: {pending[1]})이 있어 스냅샷을 가져올 수 없습니다. "
+            "적재를 마친 뒤 다시 시도해주세요."
+        )
+    collection_name = new_version_name()
+    collection = create_collection(collection_name)
+    run_id = journal.start_run(collection_name, kind=SNAPSHOT_RUN)
+    print(f"새 버전 컬렉션 생성: {collection_name}")
+
+    types = table.column("type").to_pylist()
+    texts = table.column("text").to_pylist()
+    metadatas = table.column("metadata").to_pylist()
+    try:
+        for start in tqdm(range(0, len(vectors), batch_size), desc="스냅샷 DB 저장 중"):
+            end = start + batch_size
+            collection.insert([
+                texts[start:end],
+                np.asarray(vectors[start:end], dtype=np.float32).tolist(),
+                [json.loads(m) for m in metadatas[start:end]],
+                types[start:end],
+            ])
+        build_index_and_activate(collection)
+    except BaseException:
+        # 일부만 채워진 컬렉션은 서비스된 적이 없으므로 실행을 닫고 정리 대상으로 표시
+        journal.abandon_run(run_id)
+        journal.close()
+        raise
+    journal.activate_run(run_id)
+    journal.finish_run(run_id)
+    drop_retired_versions(journal, grace_seconds=retire_grace_seconds)
+    journal.close()
+    print(f"스냅샷 가져오기 완료: {len(vectors)}행, {time.time() - started:.1f}초")
+    return collection_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 스냅샷 내보내기/가져오기")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("snapshot_dir")
+    export_parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("snapshot_dir")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    connections.connect()
+    if args.command == "export":
+        export_snapshot(args.snapshot_dir, dtype=args.dtype)
+    else:
+        import_snapshot(args.snapshot_dir, batch_size=args.batch_size)
@@ -1,6 +1,8 @@
 import json
 import requests
 
+from utils import metrics
+
 class CompletionExecutor:
     def __init__(self, host, api_key, request_id):
         self._host = host
@@ -16,14 +18,19 @@ class CompletionExecutor:
         }
 
         final_answer = ""
-        with requests.post(self._host + '/testapp/v3/chat-completions/HCX-005',
-                           headers=headers, json=completion_request, stream=True) as r:
-            for line in r.iter_lines():
-                if line:
-                    decoded_line = line.decode("utf-8")
-                    if decoded_line.startswith("data:"):
-                        event_data = json.loads(decoded_line[len("data:"):])
-                        message_content = event_data.get("message", {}).get("content", "")
-                        if message_content:
-                            final_answer = message_content
+        try:
+            with metrics.timer("clova_request_seconds", "CLOVA Studio API 호출 시간", api="completion"), \
+                    requests.post(self._host + '/testapp/v3/chat-completions/HCX-005',
+                                  headers=headers, json=completion_request, stream=True) as r:
+                for line in r.iter_lines():
+                    if line:
+                        decoded_line = line.decode("utf-8")
+                        if decoded_line.startswith("data:"):
+                            event_data = json.loads(decoded_line[len("data:"):])
+                            message_content = event_data.get("message", {}).get("content", "")
+                            if message_content:
+                                final_answer = message_content
+        except Exception:
+            metrics.counter("clova_request_errors_total", "CLOVA Studio API 호출 실패 수").inc(api="completion")
+            raise
         return final_answer 
\ No newline at end of file
@@ -1,6 +1,8 @@
 import http.client
 import json
 
+from utils import metrics
+
 class EmbeddingExecutor:
     def __init__(self, host, api_key, request_id):
         self._host = host
@@ -22,10 +24,16 @@ class EmbeddingExecutor:
         return result
 
     def execute(self, completion_request):
-        res = self._send_request(completion_request)
+        try:
+            with metrics.timer("clova_request_seconds", "CLOVA Studio API 호출 시간", api="embedding"):
+                res = self._send_request(completion_request)
+        except Exception:
+            metrics.counter("clova_request_errors_total", "CLOVA Studio API 호출 실패 수").inc(api="embedding")
+            raise
         if res['status']['code'] == '20000':
             return res['result']['embedding']
         else:
+            metrics.counter("clova_request_errors_total", "CLOVA Studio API 호출 실패 수").inc(api="embedding")
             error_code = res["status"]["code"]
             error_message = res.get("status", {}).get("message", "Unknown error")
             raise ValueError(f"오류 발생: {error_code}: {error_message}") 
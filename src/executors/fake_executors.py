@@ -0,0 +1,68 @@
+import math
+import threading
+import time
+import zlib
+
+from executors.local_segmentation_executor import LocalSegmentationExecutor
+
+
+class _CallCounter:
+    """호출 횟수를 세고 delay초만큼 지연시켜 원격 API 지연을 흉내 냅니다."""
+
+    def __init__(self, delay=0.0):
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _record_call(self):
+        with self._lock:
+            self.calls += 1
+        if self._delay:
+            time.sleep(self._delay)
+
+
+class FakeSegmentationExecutor(_CallCounter):
+    """CLOVA 문단 나누기 API 대신 LocalSegmentationExecutor 결과를 반환하는 오프라인 실행자"""
+
+    def __init__(self, delay=0.0):
+        super().__init__(delay)
+        self._local = LocalSegmentationExecutor()
+
+    def execute(self, completion_request):
+        self._record_call()
+        return self._local.execute(completion_request)
+
+
+class FakeEmbeddingExecutor(_CallCounter):
+    """
+    CLOVA 임베딩 API 대신 글자 bigram 해시로 만든 결정적인 단위 벡터를 반환합니다.
+    같은 텍스트는 항상 같은 벡터가 되고, 글자가 많이 겹치는 텍스트일수록 내적이 커집니다.
+
+    Args:
+        dim (int): 벡터 차원 (컬렉션 스키마와 같은 1024)
+        delay (float): 호출마다 대기할 시간 (초)
+    """
+
+    def __init__(self, dim=1024, delay=0.0):
+        super().__init__(delay)
+        self._dim = dim
+
+    def execute(self, completion_request):
+        self._record_call()
+        text = completion_request.get("text", "")
+        vector = [0.0] * self._dim
+        for i in range(max(len(text) - 1, 1)):
+            vector[zlib.crc32(text[i:i + 2].encode("utf-8")) % self._dim] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+class FakeCompletionExecutor(_CallCounter):
+    """CLOVA 채팅 완성 API 대신 전달받은 reference 수와 질문을 담은 고정 형식의 답변을 반환합니다."""
+
+    def execute(self, completion_request):
+        self._record_call()
+        messages = completion_request.get("messages", [])
+        references = sum(1 for m in messages if m["role"] == "user" and m["content"].startswith("reference:"))
+        question = messages[-1]["content"] if messages else ""
+        return f"[오프라인 답변] reference {references}개를 바탕으로 한 '{question}'에 대한 답변입니다."
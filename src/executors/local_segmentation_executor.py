@@ -0,0 +1,93 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from utils import metrics
+
+# 마침표/물음표/느낌표(따옴표·괄호로 닫히는 경우 포함) 뒤의 공백에서 문장을 나눔
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?]["\'”’)\]])\s+|(?<=[.!?])\s+')
+
+
+class LocalSegmentationExecutor:
+    """
+    CLOVA 문단 나누기 API와 같은 형태(문단별 문장 리스트)를 반환하는 규칙 기반 분할기.
+    네트워크 호출 없이 동작하므로 질의 경로에서 원격 호출을 대신할 수 있습니다.
+
+    Args:
+        max_chars (int): 한 문단의 최대 길이. 넘으면 문장 단위로 새 문단을 시작합니다.
+        min_chars (int): 이보다 짧은 줄(제목, 기자명 등)은 다음 줄과 합칩니다.
+    """
+
+    def __init__(self, max_chars=400, min_chars=40):
+        self._max_chars = max_chars
+        self._min_chars = min_chars
+
+    @metrics.timed("local_segmentation_seconds", "로컬 문단 나누기 시간")
+    def execute(self, completion_request):
+        text = completion_request.get("text", "")
+        max_chars = completion_request.get("postProcessMaxSize") or self._max_chars
+
+        segments, current, current_len = [], [], 0
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            # 빈 줄/줄바꿈은 문단 경계로 보되, 현재 문단이 너무 짧으면 이어 붙임
+            if current and current_len >= self._min_chars:
+                segments.append(current)
+                current, current_len = [], 0
+            for sentence in SENTENCE_BOUNDARY.split(line):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                if current and current_len + len(sentence) > max_chars:
+                    segments.append(current)
+                    current, current_len = [], 0
+                current.append(sentence)
+                current_len += len(sentence) + 1
+        if current:
+            segments.append(current)
+        return segments
+
+
+class RacingSegmentationExecutor:
+    """
+    원격 분할기를 먼저 호출하고, timeout 안에 성공하지 못하면 로컬 분할 결과를 반환합니다.
+    원격 호출이 실패('Error' 반환 또는 예외)해도 로컬 결과로 대체합니다.
+
+    timeout으로 포기한 원격 호출도 끝날 때까지 워커 스레드를 차지하므로, 모든 워커가 사용 중이면
+    풀에 대기시키지 않고 바로 로컬 결과를 반환합니다. (remote에는 소켓 timeout을 함께 지정해야
+    멈춘 호출이 워커를 계속 붙잡지 않습니다. setup_query_segmenter 참고)
+
+    Args:
+        remote: SegmentationExecutor
+        local: LocalSegmentationExecutor
+        timeout (float): 원격 결과를 기다리는 최대 시간 (초)
+    """
+
+    _max_workers = 8
+    _pool = ThreadPoolExecutor(max_workers=_max_workers)
+    _slots = threading.BoundedSemaphore(_max_workers)
+
+    def __init__(self, remote, local, timeout=1.5):
+        self._remote = remote
+        self._local = local
+        self._timeout = timeout
+
+    def execute(self, completion_request):
+        if not self._slots.acquire(blocking=False):
+            reason = "busy"
+        else:
+            future = self._pool.submit(self._remote.execute, completion_request)
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                result = future.result(timeout=self._timeout)
+                if result != 'Error':
+                    return result
+                reason = "error"
+            except TimeoutError:
+                reason = "timeout"
+            except Exception:
+                reason = "error"
+        metrics.counter("segmentation_fallback_total", "원격 분할 대신 로컬 분할을 사용한 횟수").inc(reason=reason)
+        return self._local.execute(completion_request)
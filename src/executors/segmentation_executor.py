@@ -1,11 +1,18 @@
 import http.client
 import json
 
+from utils import metrics
+
 class SegmentationExecutor:
-    def __init__(self, host, api_key, request_id):
+    def __init__(self, host, api_key, request_id, timeout=None):
         self._host = host
         self._api_key = api_key
         self._request_id = request_id
+        self._timeout = timeout
+
+    def with_timeout(self, timeout):
+        """같은 API 설정에 소켓 timeout(초)만 지정한 실행자를 반환합니다."""
+        return SegmentationExecutor(self._host, self._api_key, self._request_id, timeout=timeout)
 
     def _send_request(self, completion_request):
         headers = {
@@ -14,7 +21,7 @@ class SegmentationExecutor:
             'X-NCP-CLOVASTUDIO-REQUEST-ID': self._request_id
         }
 
-        conn = http.client.HTTPSConnection(self._host)
+        conn = http.client.HTTPSConnection(self._host, timeout=self._timeout)
         conn.request('POST', '/serviceapp/v1/api-tools/segmentation', json.dumps(completion_request), headers)
         response = conn.getresponse()
         result = json.loads(response.read().decode(encoding='utf-8'))
@@ -22,10 +29,16 @@ class SegmentationExecutor:
         return result
 
     def execute(self, completion_request):
-        res = self._send_request(completion_request)
+        try:
+            with metrics.timer("clova_request_seconds", "CLOVA Studio API 호출 시간", api="segmentation"):
+                res = self._send_request(completion_request)
+        except Exception:
+            metrics.counter("clova_request_errors_total", "CLOVA Studio API 호출 실패 수").inc(api="segmentation")
+            raise
         if res['status']['code'] == '20000':
             return res['result']['topicSeg']
         else:
+            metrics.counter("clova_request_errors_total", "CLOVA Studio API 호출 실패 수").inc(api="segmentation")
             return 'Error'
 
 
@@ -1,27 +1,53 @@
-from pymilvus import connections, Collection, utility
 from concurrent.futures import ThreadPoolExecutor
 import json
-from pymilvus import Collection, utility
 from datetime import datetime
 
-def answer_question(question, embedding_executor, completion_executor):
-    collection_name = "NewsPickStock"
-    if not utility.has_collection(collection_name):
-        return f"'{collection_name}' 컬렉션이 존재하지 않습니다. 먼저 문서를 처리하고 저장해주세요.", []
+from db.collection_alias import COLLECTION_ALIAS, get_search_collection
+from executors.local_segmentation_executor import LocalSegmentationExecutor
+from utils.chunk_filter import is_irrelevant_chunk
+from utils.clean_text import clean_text
+from utils import metrics
+
+STAGE_METRIC = "hybrid_search_stage_seconds"
+SEARCH_METRIC = "milvus_search_seconds"
+
+
+def preprocess_news(news_text, segmentation_executor):
+    """
+    뉴스 본문을 정제하고 문단 단위로 나눈 뒤 불필요한 청크를 걸러냅니다.
+
+    Returns:
+        tuple: (정제된 본문, 필터링된 전체 텍스트, 필터링된 청크 리스트)
+    """
+    cleaned_text = clean_text(news_text)
+    segmented_chunks = segmentation_executor.execute({"text": news_text})
+    if segmented_chunks == 'Error':
+        # 원격 분할 실패 시 문자열을 글자 단위로 순회하지 않도록 로컬 분할로 대체
+        segmented_chunks = LocalSegmentationExecutor().execute({"text": news_text})
+    filtered_chunks = []
+    for chunk in segmented_chunks:
+        chunk_text = chunk if isinstance(chunk, str) else ' '.join(chunk)
+        if not is_irrelevant_chunk(chunk_text):
+            filtered_chunks.append(chunk_text)
+    filtered_full_text = '\n'.join(filtered_chunks)
+    return cleaned_text, filtered_full_text, filtered_chunks
 
-    collection = Collection(collection_name)
-    collection.load()
+def answer_question(question, embedding_executor, completion_executor):
+    collection = get_search_collection()
+    if collection is None:
+        return f"'{COLLECTION_ALIAS}' 컬렉션이 존재하지 않습니다. 먼저 문서를 처리하고 저장해주세요.", []
 
     query_vector = embedding_executor.execute({"text": question})
 
     search_params = {"metric_type": "IP", "params": {"ef": 64}}
-    results = collection.search(
-        data=[query_vector],
-        anns_field="embedding",
-        param=search_params,
-        limit=10,
-        output_fields=["source", "text"]
-    )
+    with metrics.timer(SEARCH_METRIC, "Milvus 검색 시간", kind="answer"):
+        results = collection.search(
+            data=[query_vector],
+            anns_field="embedding",
+            param=search_params,
+            limit=10,
+            output_fields=["source", "text"]
+        )
 
     reference = [{"distance": hit.distance, "source": hit.entity.get("source"), "text": hit.entity.get("text")} for hit in results[0]]
 
@@ -57,117 +83,122 @@ def hybrid_search(
     chunk_vectors=None,
     filtered_full_text=None,
     filtered_chunks=None,
-    date_window: int = 10
+    date_window: int = 10,
+    search_batcher=None
 ):
-    collection_name = "NewsPickStock"
-    if not utility.has_collection(collection_name):
-        return f"'{collection_name}' 컬렉션이 존재하지 않습니다. 먼저 문서를 처리하고 저장해주세요.", []
-
-    collection = Collection(collection_name)
-    collection.load()
+    collection = get_search_collection()
+    if collection is None:
+        return f"'{COLLECTION_ALIAS}' 컬렉션이 존재하지 않습니다. 먼저 문서를 처리하고 저장해주세요.", []
 
     # 전체 임베딩
     if doc_vector is None:
-        doc_vector = embedding_executor.execute({"text": filtered_full_text or news_text})
+        with metrics.timer(STAGE_METRIC, "hybrid_search 단계별 시간", stage="doc_embedding"):
+            doc_vector = embedding_executor.execute({"text": filtered_full_text or news_text})
 
     # 청크 임베딩
     if chunk_vectors is None:
-        chunks = filtered_chunks or segmentation_executor.execute({"text": news_text})
-        chunk_vectors = [embedding_executor.execute({"text": chunk}) for chunk in chunks if isinstance(chunk, str) and len(chunk) > 10]
+        with metrics.timer(STAGE_METRIC, "hybrid_search 단계별 시간", stage="chunk_embedding"):
+            chunks = filtered_chunks or segmentation_executor.execute({"text": news_text})
+            chunk_vectors = [embedding_executor.execute({"text": chunk}) for chunk in chunks if isinstance(chunk, str) and len(chunk) > 10]
 
     search_params = {"metric_type": "IP", "params": {"ef": 32}}
 
+    def search_one(vector, limit, expr, kind):
+        with metrics.timer(SEARCH_METRIC, "Milvus 검색 시간", kind=kind):
+            # search_batcher가 주어지면 다른 요청의 벡터와 묶어서 검색
+            if search_batcher is not None:
+                return search_batcher.search(vector, search_params, limit, ["metadata", "type"], expr=expr)
+            return collection.search(
+                data=[vector],
+                anns_field="embedding",
+                param=search_params,
+                limit=limit,
+                output_fields=["metadata", "type"],
+                expr=expr
+            )[0]
+
     # 기업 다양성 확보 (문서)
     doc_topk = topk
-    while True:
-        doc_results = collection.search(
-            data=[doc_vector],
-            anns_field="embedding",
-            param=search_params,
-            limit=doc_topk,
-            output_fields=["metadata", "type"],
-            expr="type == 'doc'"
-        )[0]
-        doc_companies = set((hit.entity.get("metadata") or {}).get("company") for hit in doc_results)
-        if len(doc_companies) >= 3 or doc_topk >= 50:
-            break
-        doc_topk += 10
+    with metrics.timer(STAGE_METRIC, "hybrid_search 단계별 시간", stage="doc_search"):
+        while True:
+            doc_results = search_one(doc_vector, doc_topk, "type == 'doc'", "doc")
+            doc_companies = set((hit.entity.get("metadata") or {}).get("company") for hit in doc_results)
+            if len(doc_companies) >= 3 or doc_topk >= 50:
+                break
+            doc_topk += 10
 
     # 기업 다양성 확보 (청크)
     chunk_topk = topk
+    # 스레드 풀에서도 현재 요청의 trace에 기록되도록 context를 전달
+    @metrics.bind_context
     def search_chunk(chunk_vector):
-        return collection.search(
-            data=[chunk_vector],
-            anns_field="embedding",
-            param=search_params,
-            limit=chunk_topk,
-            output_fields=["metadata", "type"],
-            expr="type == 'chunk'"
-        )[0]
-
-    with ThreadPoolExecutor() as executor:
-        results = executor.map(search_chunk, chunk_vectors)
-        chunk_results = [hit for result in results for hit in result]
-
-    chunk_companies = set((hit.entity.get("metadata") or {}).get("company") for hit in chunk_results)
-    while len(chunk_companies) < 3 and chunk_topk <= 50:
-        chunk_topk += 10
+        return search_one(chunk_vector, chunk_topk, "type == 'chunk'", "chunk")
+
+    with metrics.timer(STAGE_METRIC, "hybrid_search 단계별 시간", stage="chunk_search"):
         with ThreadPoolExecutor() as executor:
             results = executor.map(search_chunk, chunk_vectors)
             chunk_results = [hit for result in results for hit in result]
+
         chunk_companies = set((hit.entity.get("metadata") or {}).get("company") for hit in chunk_results)
+        while len(chunk_companies) < 3 and chunk_topk <= 50:
+            chunk_topk += 10
+            with ThreadPoolExecutor() as executor:
+                results = executor.map(search_chunk, chunk_vectors)
+                chunk_results = [hit for result in results for hit in result]
+            chunk_companies = set((hit.entity.get("metadata") or {}).get("company") for hit in chunk_results)
 
     # 결과 통합 및 prices 구조 생성
-    company_map = {}
-
-    for hit in doc_results + chunk_results:
-        entity = hit.entity
-        meta = entity.metadata if hasattr(entity, "metadata") else {}
-        company = meta.get("company")
-        base_date_str = meta.get("base_date")
-        date_str = meta.get("date")
-
-        if not company or not base_date_str or not date_str:
-            continue
-
-        try:
-            base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-        except Exception as e:
-            print(f"[⚠️ 날짜 파싱 실패] meta: {meta} | 오류: {e}")
-            continue
-
-        delta_days = (date - base_date).days
-        if abs(delta_days) > date_window:
-            continue
-
-        # ✅ company + base_date 를 고유 키로 사용
-        key = f"{company}__{base_date_str}"
-        score = hit.distance * (doc_weight if entity.get("type") == "doc" else chunk_weight)
-
-        if key not in company_map:
-            company_map[key] = {
-                "company": company,
-                "base_date": base_date_str,
-                "prices": [],
-                "score": 0.0
-            }
-
-        company_map[key]["prices"].append({
-            "date": date_str,
-            "open": meta.get("open"),
-            "high": meta.get("high"),
-            "low": meta.get("low"),
-            "close": meta.get("close"),
-            "volume": meta.get("volume"),
-            "url": meta.get("url")
-        })
-
-        company_map[key]["score"] += score
-
-    # 날짜순 정렬
-    for comp in company_map.values():
-        comp["prices"] = sorted(comp["prices"], key=lambda x: x["date"])
-
-    ranked = sorted(company_map.values(), key=lambda x: x["score"], reverse=True)
+    with metrics.timer(STAGE_METRIC, "hybrid_search 단계별 시간", stage="aggregation"):
+        company_map = {}
+
+        for hit in doc_results + chunk_results:
+            entity = hit.entity
+            meta = entity.metadata if hasattr(entity, "metadata") else {}
+            company = meta.get("company")
+            base_date_str = meta.get("base_date")
+            date_str = meta.get("date")
+
+            if not company or not base_date_str or not date_str:
+                continue
+
+            try:
+                base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
+                date = datetime.strptime(date_str, "%Y-%m-%d")
+            except Exception as e:
+                print(f"[⚠️ 날짜 파싱 실패] meta: {meta} | 오류: {e}")
+                continue
+
+            delta_days = (date - base_date).days
+            if abs(delta_days) > date_window:
+                continue
+
+            # ✅ company + base_date 를 고유 키로 사용
+            key = f"{company}__{base_date_str}"
+            score = hit.distance * (doc_weight if entity.get("type") == "doc" else chunk_weight)
+
+            if key not in company_map:
+                company_map[key] = {
+                    "company": company,
+                    "base_date": base_date_str,
+                    "prices": [],
+                    "score": 0.0
+                }
+
+            company_map[key]["prices"].append({
+                "date": date_str,
+                "open": meta.get("open"),
+                "high": meta.get("high"),
+                "low": meta.get("low"),
+                "close": meta.get("close"),
+                "volume": meta.get("volume"),
+                "url": meta.get("url")
+            })
+
+            company_map[key]["score"] += score
+
+        # 날짜순 정렬
+        for comp in company_map.values():
+            comp["prices"] = sorted(comp["prices"], key=lambda x: x["date"])
+
+        ranked = sorted(company_map.values(), key=lambda x: x["score"], reverse=True)
     return ranked[:3]
\ No newline at end of file
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from pymilvus import connections
+
+from db.collection_alias import set_search_collection, start_retired_version_gc
+from db.offline_collection import load_offline_collection
+from db.search_batcher import SearchBatcher
+from rag import answer_question, hybrid_search, preprocess_news
+from utils import metrics
+from utils.setup import setup_executors, setup_offline_executors, setup_query_segmenter
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RecommendationService:
+    """
+    hybrid_search / answer_question을 HTTP로 노출하는 asyncio 서비스.
+
+    - 동일한 요청이 처리 중이면 새로 실행하지 않고 진행 중인 결과를 공유합니다.
+    - 여러 요청의 청크 벡터 검색은 SearchBatcher를 통해 하나의 Milvus 검색으로 묶입니다.
+    - /metrics(Prometheus 텍스트), /metrics.json으로 지연 시간 히스토그램과 큐 길이를 제공합니다.
+
+    Args:
+        executors (tuple): setup_executors()가 반환하는 (segmentation, embedding, completion) 실행자
+        max_workers (int): 블로킹 작업(API 호출, Milvus 검색)을 실행할 스레드 수
+        batch_window_ms (float): 검색 마이크로 배칭 시간 창 (밀리초)
+        query_segmenter (str): 질의 문단 분할 방식 ('local', 'race', 'remote'). 기본값은 QUERY_SEGMENTER 환경 변수
+    """
+
+    def __init__(self, executors, max_workers=16, batch_window_ms=5.0, query_segmenter=None):
+        segmentation_executor, self.embedding_executor, self.completion_executor = executors
+        self.segmentation_executor = setup_query_segmenter(segmentation_executor, mode=query_segmenter)
+        self.search_batcher = SearchBatcher(window_ms=batch_window_ms)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._inflight = {}
+        self._active = 0
+
+    def _run_hybrid_search(self, body):
+        text = body["text"]
+        cleaned_text, filtered_full_text, filtered_chunks = preprocess_news(text, self.segmentation_executor)
+        result = hybrid_search(
+            cleaned_text,
+            self.segmentation_executor,
+            self.embedding_executor,
+            topk=body.get("topk", 10),
+            doc_weight=body.get("doc_weight", 1.0),
+            chunk_weight=body.get("chunk_weight", 0.7),
+            filtered_full_text=filtered_full_text,
+            filtered_chunks=filtered_chunks,
+            date_window=body.get("date_window", 10),
+            search_batcher=self.search_batcher
+        )
+        if isinstance(result, tuple):
+            # 컬렉션이 없을 때는 (메시지, []) 형태로 반환됨
+            return 503, {"error": result[0]}
+        return 200, {"results": result}
+
+    def _run_answer_question(self, body):
+        answer, reference = answer_question(body["question"], self.embedding_executor, self.completion_executor)
+        if not reference:
+            return 503, {"error": answer}
+        return 200, {"answer": answer, "reference": reference}
+
+    async def _coalesce(self, key, func, body):
+        """동일 key의 요청이 진행 중이면 그 결과를 기다리고, 아니면 새로 실행합니다."""
+        future = self._inflight.get(key)
+        if future is not None:
+            metrics.counter("service_coalesced_requests_total", "진행 중인 요청과 결과를 공유한 요청 수").inc(path=key[0])
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._active += 1
+        try:
+            result = await loop.run_in_executor(self._pool, func, body)
+        except asyncio.CancelledError:
+            # 첫 요청이 취소되어도(서버 종료 등) 합류한 요청이 영원히 기다리지 않도록 future를 종료
+            future.set_exception(RuntimeError("공유 중이던 요청이 취소되었습니다."))
+            future.exception()  # 합류한 요청이 없을 때 'never retrieved' 경고 방지
+            raise
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._active -= 1
+            del self._inflight[key]
+        return await future
+
+    def update_gauges(self):
+        metrics.gauge("service_active_requests", "실행 중인 요청 수").set(self._active)
+        metrics.gauge("service_inflight_keys", "진행 중인 고유 요청 수").set(len(self._inflight))
+        metrics.gauge("service_search_queue_depth", "배치 대기 중인 검색 벡터 수").set(self.search_batcher.queue_depth)
+
+    async def dispatch(self, method, path, raw_body):
+        routes = {
+            "/hybrid_search": (self._run_hybrid_search, "text"),
+            "/answer_question": (self._run_answer_question, "question"),
+        }
+        if path == "/metrics":
+            self.update_gauges()
+            return 200, metrics.REGISTRY.to_prometheus()
+        if path == "/metrics.json":
+            self.update_gauges()
+            return 200, metrics.REGISTRY.snapshot()
+        if path == "/healthz":
+            return 200, {"status": "ok"}
+        if path not in routes:
+            return 404, {"error": f"알 수 없는 경로입니다: {path}"}
+        if method != "POST":
+            return 405, {"error": "POST 요청만 지원합니다."}
+
+        try:
+            body = json.loads(raw_body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"JSON 파싱 실패: {e}"}
+        func, required = routes[path]
+        if not isinstance(body, dict) or not isinstance(body.get(required), str):
+            return 400, {"error": f"'{required}' 필드가 필요합니다."}
+
+        key = (path, json.dumps(body, sort_keys=True, ensure_ascii=False))
+        started = time.perf_counter()
+        status = 500
+        try:
+            status, payload = await self._coalesce(key, func, body)
+            return status, payload
+        except Exception as e:
+            return 500, {"error": str(e)}
+        finally:
+            metrics.histogram("service_request_seconds", "HTTP 요청 처리 시간").observe(
+                time.perf_counter() - started, path=path, status=status
+            )
+
+    async def _read_request(self, reader):
+        """요청을 읽어 (method, path, body)를 반환합니다. 요청 없이 연결이 닫히면 None"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        raw_body = await reader.readexactly(length) if length else b""
+        return method.upper(), urlsplit(target).path, raw_body
+
+    async def handle_connection(self, reader, writer):
+        # 어떤 경로로 끝나더라도 writer는 반드시 닫아서 transport가 남지 않도록 함
+        try:
+            try:
+                request = await self._read_request(reader)
+                if request is None:
+                    return
+                status, payload = await self.dispatch(*request)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                status, payload = 400, {"error": f"잘못된 HTTP 요청입니다: {e}"}
+            except ConnectionError:
+                # 클라이언트가 먼저 연결을 끊은 경우 응답할 대상이 없음
+                return
+            except Exception as e:
+                status, payload = 500, {"error": str(e)}
+
+            if isinstance(payload, str):
+                # Prometheus 텍스트 형식
+                data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                data, content_type = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"), "application/json; charset=utf-8"
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8600):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"추천 서비스 시작: http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def create_service(executors=None, **kwargs):
+    """
+    executors를 주지 않으면 setup_executors()로 생성하고 Milvus에 연결합니다.
+    유예 기간이 지난 이전 버전 컬렉션을 정리하는 백그라운드 스레드도 함께 시작합니다.
+    """
+    if executors is None:
+        executors = setup_executors()
+    connections.connect()
+    start_retired_version_gc()
+    return RecommendationService(executors, **kwargs)
+
+
+def create_offline_service(data_dir="data", delay=0.0, **kwargs):
+    """
+    CLOVA API와 Milvus 없이 대체 실행자와 메모리 내 컬렉션으로 서비스를 생성합니다.
+    data_dir의 .txt 파일을 오프라인 컬렉션에 적재하고, 검색 경로가 이 컬렉션을 사용하도록 지정합니다.
+    질의 분할도 대체 실행자를 그대로 사용합니다.
+    """
+    executors = setup_offline_executors(delay)
+    set_search_collection(load_offline_collection(data_dir, executors[0], executors[1], delay=delay))
+    return RecommendationService(executors, query_segmenter="remote", **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="뉴스 기반 주식 추천 HTTP 서비스")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    parser.add_argument("--query-segmenter", choices=["local", "race", "remote"], default=None)
+    parser.add_argument("--offline", metavar="DATA_DIR", default=None,
+                        help="CLOVA/Milvus 대신 대체 실행자와 DATA_DIR로 만든 메모리 내 컬렉션 사용")
+    parser.add_argument("--offline-delay", type=float, default=0.0, help="오프라인 모드에서 API/검색 호출마다 지연할 시간 (초)")
+    args = parser.parse_args()
+
+    if args.offline:
+        service = create_offline_service(args.offline, delay=args.offline_delay,
+                                         max_workers=args.workers, batch_window_ms=args.batch_window_ms)
+    else:
+        service = create_service(max_workers=args.workers, batch_window_ms=args.batch_window_ms,
+                                 query_segmenter=args.query_segmenter)
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,240 @@
+import bisect
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 현재 요청의 단계별 시간 기록 (trace_request 안에서만 설정됨)
+_current_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key):
+    if not label_key:
+        return ""
+    escaped = []
+    for k, v in label_key:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """단조 증가 카운터"""
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """현재 값을 덮어쓰는 게이지 (예: 큐 길이)"""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (Prometheus와 같은 누적 버킷 방식으로 내보냄)"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self._buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][bisect.bisect_left(self._buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def _cumulative(self, counts):
+        total, result = 0, []
+        for bound, count in zip(self._buckets + (float("inf"),), counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            for bound, total in self._cumulative(state["counts"]):
+                samples.append((f"{self.name}_bucket", key + (("le", bound),), total))
+            samples.append((f"{self.name}_sum", key, state["sum"]))
+            samples.append((f"{self.name}_count", key, state["count"]))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            items = [(key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items()]
+        return [{
+            "labels": dict(key),
+            "count": state["count"],
+            "sum": round(state["sum"], 6),
+            "buckets": dict(self._cumulative(state["counts"])),
+        } for key, state in items]
+
+
+class MetricsRegistry:
+    """이름으로 메트릭을 등록/조회하고 Prometheus 텍스트 또는 JSON 스냅샷으로 내보냅니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls) or metric.kind != cls.kind:
+                raise ValueError(f"'{name}' 메트릭이 다른 타입({metric.kind})으로 이미 등록되어 있습니다.")
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def to_prometheus(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, key, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {"type": m.kind, "help": m.help, "values": m.snapshot()} for m in metrics}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class RequestTrace:
+    """한 요청 안에서 기록된 단계별 소요 시간"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.records = []
+
+    def add(self, stage, seconds):
+        self.records.append((stage, seconds))
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        """단계별 호출 수, 합계/최대 시간(초) 리스트. 합계가 큰 단계부터 정렬됩니다."""
+        stages = {}
+        for stage, seconds in list(self.records):
+            item = stages.setdefault(stage, {"stage": stage, "calls": 0, "total_s": 0.0, "max_s": 0.0})
+            item["calls"] += 1
+            item["total_s"] += seconds
+            item["max_s"] = max(item["max_s"], seconds)
+        for item in stages.values():
+            item["total_s"] = round(item["total_s"], 4)
+            item["max_s"] = round(item["max_s"], 4)
+        return sorted(stages.values(), key=lambda x: x["total_s"], reverse=True)
+
+
+@contextmanager
+def trace_request():
+    """with 블록 안에서 실행된 timer들을 RequestTrace에 함께 기록합니다."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finished = time.perf_counter()
+        _current_trace.reset(token)
+
+
+@contextmanager
+def timer(name, help_text="", **labels):
+    """블록 실행 시간을 name 히스토그램(초)에 기록합니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram(name, help_text).observe(elapsed, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            label_text = ",".join(f"{k}={v}" for k, v in _label_key(labels))
+            trace.add(f"{name}[{label_text}]" if label_text else name, elapsed)
+
+
+def timed(name, help_text="", **labels):
+    """함수 실행 시간을 기록하는 데코레이터"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, help_text, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(func):
+    """
+    ThreadPoolExecutor 등 다른 스레드에서 실행될 함수에 현재 요청의 trace를 전달합니다.
+    (스레드 풀은 contextvars를 자동으로 넘겨주지 않음)
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
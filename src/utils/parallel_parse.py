@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.split_article_and_metadata import METADATA_KEYS, split_article_rows
+
+
+def _pool_context():
+    # 호출하는 프로세스에는 pymilvus gRPC 스레드와 Streamlit 스레드가 떠 있으므로 fork하지 않음
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _parse_file(file_path):
+    # 예외 객체 대신 메시지만 돌려보내 직렬화 문제를 피함
+    try:
+        return split_article_rows(file_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def rows_to_articles(rows):
+    """split_article_rows의 튜플을 (metadata 딕셔너리, 본문) 형태로 변환합니다."""
+    return [(dict(zip(METADATA_KEYS, row[:-1])), row[-1]) for row in rows]
+
+
+def iter_parsed_files(file_paths, max_workers=None):
+    """
+    여러 .txt 파일을 프로세스 풀에서 병렬로 파싱하고 입력 순서대로 결과를 넘겨줍니다.
+
+    동시에 처리 중인 파일 수를 워커 수의 2배로 제한하므로, 소비하는 쪽(임베딩 등)이
+    느려도 파싱 결과가 메모리에 계속 쌓이지 않습니다.
+
+    워커는 fork 대신 forkserver(없으면 spawn)로 만들기 때문에, 이 함수를 호출하는 스크립트는
+    `if __name__ == "__main__":` 가드 아래에서 실행되어야 합니다.
+
+    Args:
+        file_paths (list): 파싱할 파일 경로 리스트
+        max_workers (int): 프로세스 수 (기본값: CPU 코어 수)
+
+    Yields:
+        tuple: (file_path, rows, error) - 성공 시 rows는 split_article_rows 결과, error는 None
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+    if max_workers <= 1:
+        for file_path in file_paths:
+            yield (file_path, *_parse_file(file_path))
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as executor:
+        pending = deque()
+        remaining = iter(file_paths)
+        for file_path in remaining:
+            pending.append((file_path, executor.submit(_parse_file, file_path)))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            file_path, future = pending.popleft()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(_parse_file, next_path)))
+            yield (file_path, *future.result())
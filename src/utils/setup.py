@@ -2,6 +2,7 @@ import os
 from dotenv import load_dotenv
 
 from executors.segmentation_executor import SegmentationExecutor
+from executors.local_segmentation_executor import LocalSegmentationExecutor, RacingSegmentationExecutor
 from executors.embedding_executor import EmbeddingExecutor
 from executors.completion_executor import CompletionExecutor
 
@@ -28,4 +29,35 @@ def setup_executors():
         api_key=api_key,
         request_id='bde424d9851d426ab52096633744b993'
     )
-    return segmentation_executor, embedding_executor, completion_executor 
\ No newline at end of file
+    return segmentation_executor, embedding_executor, completion_executor
+
+def setup_offline_executors(delay=0.0):
+    """
+    CLOVA API 없이 동작하는 (segmentation, embedding, completion) 대체 실행자를 반환합니다.
+    delay를 주면 각 호출이 그만큼 지연되어 요청 공유/배치 동작을 확인할 수 있습니다.
+    """
+    # 테스트/오프라인 실행에서만 필요하므로 운영 경로에서는 불러오지 않음
+    from executors.fake_executors import FakeSegmentationExecutor, FakeEmbeddingExecutor, FakeCompletionExecutor
+
+    return FakeSegmentationExecutor(delay), FakeEmbeddingExecutor(delay=delay), FakeCompletionExecutor(delay)
+
+def setup_query_segmenter(segmentation_executor, mode=None, timeout=1.5):
+    """
+    질의 경로에서 사용할 문단 분할기를 반환합니다. (문서 적재는 CLOVA 분할기를 그대로 사용)
+
+    Args:
+        segmentation_executor: setup_executors()가 만든 원격 SegmentationExecutor
+        mode (str): 'local'(기본값, 로컬 규칙 기반), 'race'(원격 우선, timeout 초과/실패 시 로컬), 'remote'
+                    지정하지 않으면 QUERY_SEGMENTER 환경 변수를 사용합니다.
+        timeout (float): 'race' 모드에서 원격 결과를 기다리는 최대 시간 (초)
+    """
+    mode = mode or os.getenv('QUERY_SEGMENTER', 'local')
+    if mode == 'local':
+        return LocalSegmentationExecutor()
+    if mode == 'race':
+        # 포기한 원격 호출이 워커 스레드를 오래 붙잡지 않도록 소켓 timeout도 같은 값으로 지정
+        remote = segmentation_executor.with_timeout(timeout) if hasattr(segmentation_executor, "with_timeout") else segmentation_executor
+        return RacingSegmentationExecutor(remote, LocalSegmentationExecutor(), timeout=timeout)
+    if mode == 'remote':
+        return segmentation_executor
+    raise ValueError(f"알 수 없는 QUERY_SEGMENTER 값입니다: {mode}")
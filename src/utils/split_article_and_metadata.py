@@ -1,10 +1,20 @@
 import os
 
+METADATA_KEYS = (
+    "company", "ticker", "sector", "subcategory", "category","base_date",
+    "date","days_from_base", "open", "high", "low", "close", "volume", "macd", "url"
+)
+
 def split_article_and_metadata(file_path):
-    keys = [
-        "company", "ticker", "sector", "subcategory", "category","base_date",
-        "date","days_from_base", "open", "high", "low", "close", "volume", "macd", "url"
-    ]
+    return [(dict(zip(METADATA_KEYS, row[:-1])), row[-1]) for row in split_article_rows(file_path)]
+
+def split_article_rows(file_path):
+    """
+    split_article_and_metadata와 같은 파싱을 하되, 기사마다
+    (METADATA_KEYS 순서의 메타데이터 값..., 본문) 튜플을 반환합니다.
+    프로세스 간 전달 시 딕셔너리보다 직렬화 크기가 작습니다.
+    """
+    keys = METADATA_KEYS
     results = []
     with open(file_path, 'r', encoding='utf-16') as f:
         lines = f.readlines()
@@ -15,7 +25,7 @@ def split_article_and_metadata(file_path):
         if len(parts) < len(keys):
             i += 1
             continue
-        metadata = dict(zip(keys, parts[:len(keys)]))
+        values = tuple(parts[:len(keys)])
         text = parts[len(keys)]
         # 본문이 큰따옴표로 시작하지만 끝나지 않은 경우
         if text.startswith('"') and not text.endswith('"'):
@@ -33,7 +43,7 @@ def split_article_and_metadata(file_path):
             text = '\n'.join(text_lines)
         else:
             text = text.strip('"')
-        results.append((metadata, text))
+        results.append(values + (text,))
         i += 1
     return results
 
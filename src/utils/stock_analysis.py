@@ -1,5 +1,8 @@
 import pandas as pd
 
+from utils import metrics
+
+@metrics.timed("stock_analysis_seconds", "주가 분석 함수 실행 시간", func="analyze_performance")
 def analyze_performance(prices: list, base_date: str, days_ahead: int = 5) -> dict:
     """
     base_date 이후의 주가 데이터를 바탕으로 평균 상승률, 최고 상승률, 거래량 증감률을 계산.
@@ -58,6 +61,36 @@ def analyze_performance(prices: list, base_date: str, days_ahead: int = 5) -> di
     }
 
 
+@metrics.timed("stock_analysis_seconds", "주가 분석 함수 실행 시간", func="compute_forward_returns")
+def compute_forward_returns(prices: pd.DataFrame, days_ahead: int = 5) -> pd.Series:
+    """
+    여러 (company, base_date) 묶음의 기준일 이후 평균 상승률을 한 번에 계산합니다.
+    각 묶음에 대해 analyze_performance의 avg_pct_change와 같은 값(반올림 전)을 구합니다.
+
+    Args:
+        prices (pd.DataFrame): 'company', 'base_date', 'date', 'close' 컬럼을 포함한 주가 데이터
+        days_ahead (int): 기준일 이후 몇 일치 데이터를 분석할지
+
+    Returns:
+        pd.Series: (company, base_date) 멀티 인덱스의 평균 상승률(%). 분석 불가한 묶음은 제외됩니다.
+    """
+    df = prices[["company", "base_date", "date", "close"]].copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["base_dt"] = pd.to_datetime(df["base_date"], errors="coerce")
+    df["close"] = pd.to_numeric(df["close"], errors="coerce")
+    df = df.dropna(subset=["date", "base_dt"])
+    df = df.drop_duplicates(["company", "base_date", "date"]).sort_values(["company", "base_date", "date"])
+    df["pos"] = df.groupby(["company", "base_date"]).cumcount()
+
+    base = df.loc[df["date"] == df["base_dt"], ["company", "base_date", "pos", "close"]]
+    base = base.rename(columns={"pos": "base_pos", "close": "base_close"})
+    merged = df.merge(base, on=["company", "base_date"])
+    future = merged[(merged["pos"] > merged["base_pos"]) & (merged["pos"] <= merged["base_pos"] + days_ahead)]
+    pct_change = (future["close"] - future["base_close"]) / future["base_close"] * 100
+    return pct_change.groupby([future["company"], future["base_date"]]).mean().dropna()
+
+
+@metrics.timed("stock_analysis_seconds", "주가 분석 함수 실행 시간", func="analyze_before_after_performance")
 def analyze_before_after_performance(prices: list, base_date: str, days_before: int = 5, days_after: int = 5) -> dict:
     """
     base_date를 기준으로 간단한 3개 지표만 계산합니다.